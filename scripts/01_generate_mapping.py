@@ -14,8 +14,18 @@ Usage:
 import json
 import re
 import argparse
+import string
 import sys
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 from pathlib import Path
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
 
 
 def find_project_root() -> Path:
@@ -31,11 +41,31 @@ def find_project_root() -> Path:
     sys.exit(1)
 
 
+# Rust sources parsed by this script, relative to crates/nh-core/src
+SOURCE_FILES: dict[str, str] = {
+    "monsters": "data/monsters.rs",
+    "objects": "data/objects.rs",
+    "cell": "dungeon/cell.rs",
+    "level": "dungeon/level.rs",
+    "artifacts": "data/artifacts.rs",
+    "roles": "data/roles.rs",
+}
+
+
+def load_sources(root: Path) -> dict[str, bytes]:
+    """Read every Rust source the parsers need, keyed by SOURCE_FILES name."""
+    base = root / "crates/nh-core/src"
+    return {key: (base / rel).read_bytes() for key, rel in SOURCE_FILES.items()}
+
+
 # ============================================================================
 # Color mapping: Rust constant name -> TUI color string
+#
+# The lookup tables below are read-only; they are wrapped in MappingProxyType
+# so nothing can mutate them while the parsers run.
 # ============================================================================
 
-COLOR_CONST_MAP: dict[str, str] = {
+COLOR_CONST_MAP: Mapping[str, str] = MappingProxyType({
     # Base colors (CLR_*)
     "CLR_BLACK": "black",
     "CLR_RED": "red",
@@ -70,19 +100,27 @@ COLOR_CONST_MAP: dict[str, str] = {
     "HI_MINERAL": "gray",
     "DRAGON_SILVER": "lightcyan",
     "HI_ZAP": "lightblue",
-}
+})
+
+
+_COLOR_GET = COLOR_CONST_MAP.get
 
 
 def resolve_color(const_name: str) -> str:
     """Resolve a Rust color constant name to a TUI color string."""
-    return COLOR_CONST_MAP.get(const_name.strip(), "gray")
+    return _COLOR_GET(const_name.strip(), "gray")
+
+
+def _resolve_color_fast(const_name: str) -> str:
+    """resolve_color() for regex captures, which never carry surrounding whitespace."""
+    return _COLOR_GET(const_name, "gray")
 
 
 # ============================================================================
 # ObjectClass -> TUI symbol mapping (from objclass.rs ObjectClass::symbol())
 # ============================================================================
 
-CLASS_SYMBOLS: dict[str, str] = {
+CLASS_SYMBOLS: Mapping[str, str] = MappingProxyType({
     "Random": "?",
     "IllObj": "]",
     "Weapon": ")",
@@ -101,13 +139,13 @@ CLASS_SYMBOLS: dict[str, str] = {
     "Ball": "0",
     "Chain": "_",
     "Venom": ".",
-}
+})
 
 # ============================================================================
 # CellType -> (tui_char, tui_color) mapping (from tile.rs + classic NetHack)
 # ============================================================================
 
-CELL_DISPLAY: dict[str, tuple[str, str]] = {
+CELL_DISPLAY: Mapping[str, tuple[str, str]] = MappingProxyType({
     "Stone": (" ", "gray"),
     "VWall": ("|", "gray"),
     "HWall": ("-", "gray"),
@@ -146,13 +184,13 @@ CELL_DISPLAY: dict[str, tuple[str, str]] = {
     "Cloud": ("#", "gray"),
     "Wall": ("|", "gray"),
     "Vault": (".", "gray"),
-}
+})
 
 # ============================================================================
 # TrapType -> tui_color mapping (all traps display as '^')
 # ============================================================================
 
-TRAP_COLORS: dict[str, str] = {
+TRAP_COLORS: Mapping[str, str] = MappingProxyType({
     "Arrow": "cyan",
     "Dart": "cyan",
     "RockFall": "gray",
@@ -175,66 +213,172 @@ TRAP_COLORS: dict[str, str] = {
     "MagicTrap": "lightmagenta",
     "AntiMagic": "lightmagenta",
     "Polymorph": "lightgreen",
-}
+})
+
+
+# ============================================================================
+# Regex patterns (compiled once at import time)
+#
+# Sources are read and scanned as bytes; only the captured tokens are decoded.
+# ============================================================================
+
+# Per-field fragments, combined below into one alternation per entry kind so
+# that each entry is scanned once. Group names are the scan_fields() keys.
+_NAME = rb'name:\s*"(?P<name>[^"]*)"'
+_SYMBOL = rb"symbol:\s*'(?P<symbol>.)'"
+_COLOR = rb"color:\s*(?P<color>\w+)"
+_CLASS = rb"class:\s*ObjectClass::(?P<class>\w+)"
+_MATERIAL = rb"material:\s*Material::(?P<material>\w+)"
+_OTYP = rb"otyp:\s*ObjectType::(?P<otyp>\w+)"
+
+PERMONST_FIELDS_RE = re.compile(b"|".join((_NAME, _SYMBOL, _COLOR)))
+OBJCLASSDEF_FIELDS_RE = re.compile(b"|".join((_NAME, _CLASS, _MATERIAL, _COLOR)))
+ARTIFACT_FIELDS_RE = re.compile(b"|".join((_NAME, _OTYP, _COLOR)))
+
+ROLE_RE = re.compile(rb'name:\s*RoleName::new\("(\w+)"')
+
+PERMONST_START_RE = re.compile(rb"PerMonst\s*\{")
+OBJCLASSDEF_START_RE = re.compile(rb"ObjClassDef\s*\{")
+ARTIFACT_START_RE = re.compile(rb"Artifact\s*\{")
+
+# One enum variant per line: either "Name = N" (anything may follow) or a bare
+# "Name" with an optional trailing comma. Comment and attribute lines start
+# with a non-word character and never match. [^\S\n] is whitespace within a line.
+VARIANT_RE = re.compile(
+    rb"^[^\S\n]*(\w+)(?:[^\S\n]*=[^\S\n]*(\d+)|[^\S\n]*,?[^\S\n]*$)",
+    re.MULTILINE,
+)
+
+
+@cache
+def enum_body_re(enum_name: str) -> re.Pattern[bytes]:
+    """Return the compiled pattern matching the body of `pub enum <enum_name>`."""
+    name = re.escape(enum_name.encode())
+    return re.compile(rb"pub enum " + name + rb"\s*\{(.*?)\}", re.DOTALL)
 
 
 # ============================================================================
 # Utility functions
 # ============================================================================
 
+def entry_spans(start_pattern: re.Pattern[bytes], source: bytes) -> list[tuple[int, int]]:
+    """
+    Return the (start, end) offsets of each entry opened by `start_pattern`.
+
+    Each span runs from the end of one opening match to the start of the next
+    (or the end of the source), i.e. the pieces `re.split` would produce after
+    the first, without copying them out of `source`.
+    """
+    starts = [m.span() for m in start_pattern.finditer(source)]
+    ends = [s for s, _ in starts[1:]] + [len(source)]
+    return [(e, end) for (_, e), end in zip(starts, ends)]
+
+
+def scan_fields(
+    pattern: re.Pattern[bytes], text: bytes, pos: int = 0, endpos: int | None = None
+) -> dict[str, str]:
+    """
+    Collect the first value of each named group of `pattern` found in
+    `text[pos:endpos]`.
+
+    `pattern` is an alternation of named groups; the text is scanned once and
+    the scan stops as soon as every group has been seen. Values are decoded.
+    """
+    found: dict[str, str] = {}
+    wanted = pattern.groups
+    if endpos is None:
+        endpos = len(text)
+    for m in pattern.finditer(text, pos, endpos):
+        key = m.lastgroup
+        if key is not None and key not in found:
+            found[key] = m.group(key).decode()
+            if len(found) == wanted:
+                break
+    return found
+
+
+_UPPER = frozenset(string.ascii_uppercase)
+_LOWER = frozenset(string.ascii_lowercase)
+_LOWER_OR_DIGIT = _LOWER | frozenset(string.digits)
+
+
+# Category prefixes of the Bevy sprite paths (relative to assets/)
+MONSTERS_PREFIX = "monsters/"
+ITEMS_PREFIX = "items/"
+DUNGEON_PREFIX = "dungeon/"
+TRAPS_PREFIX = "traps/"
+ARTIFACTS_PREFIX = "artifacts/"
+PLAYER_PREFIX = "player/"
+SPRITE_SUFFIX = ".png"
+
+
+def sprite_path(prefix: str, stem: str) -> str:
+    """Build a Bevy sprite path from a category prefix and an (interned) stem."""
+    return prefix + sys.intern(stem) + SPRITE_SUFFIX
+
+
+@cache
 def camel_to_snake(name: str) -> str:
-    """Convert CamelCase to snake_case."""
-    s = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name)
-    s = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1_\2", s)
-    return s.lower()
+    """Convert CamelCase to snake_case.
+
+    An underscore is inserted before an uppercase letter that follows a
+    lowercase letter or digit ("FooBar" -> "foo_bar"), or that ends a run of
+    capitals and starts a new word ("HTTPServer" -> "http_server").
+    """
+    out: list[str] = []
+    prev = ""
+    last = len(name) - 1
+    for i, c in enumerate(name):
+        if c in _UPPER and i > 0 and (
+            prev in _LOWER_OR_DIGIT
+            or (prev in _UPPER and i < last and name[i + 1] in _LOWER)
+        ):
+            out.append("_")
+        out.append(c)
+        prev = c
+    return "".join(out).lower()
 
 
+class _SafeCharTable(dict):
+    """str.translate table: keep [a-z0-9], map every other code point to '_'."""
+
+    def __missing__(self, codepoint: int) -> int:
+        return ord("_")
+
+
+_SAFE_CHARS = _SafeCharTable((ord(c), ord(c)) for c in string.ascii_lowercase + string.digits)
+
+
+@cache
 def safe_sprite_name(name: str) -> str:
     """Convert an arbitrary name to a safe file name component."""
-    s = name.lower()
-    s = re.sub(r"[^a-z0-9]+", "_", s)
-    s = s.strip("_")
-    return s
+    s = name.lower().translate(_SAFE_CHARS)
+    # Collapse runs of '_' and drop leading/trailing ones
+    return "_".join(filter(None, s.split("_")))
 
 
-def parse_enum_variants(source: str, enum_name: str) -> list[tuple[str, int]]:
+def parse_enum_variants(source: bytes, enum_name: str) -> list[tuple[str, int]]:
     """
     Parse a Rust enum and return list of (variant_name, value) tuples.
 
     Handles both explicit values (Foo = 5) and auto-incrementing variants.
     Skips comments, attributes, and the closing brace.
     """
-    pattern = rf"pub enum {enum_name}\s*\{{(.*?)\}}"
-    match = re.search(pattern, source, re.DOTALL)
+    match = enum_body_re(enum_name).search(source)
     if not match:
         print(f"Warning: Could not find enum {enum_name}", file=sys.stderr)
         return []
 
-    body = match.group(1)
     variants = []
     current_value = 0
 
-    for line in body.split("\n"):
-        line = line.strip()
-        # Skip empty lines, comments, attributes
-        if not line or line.startswith("//") or line.startswith("#"):
-            continue
-
-        # Variant with explicit value: Name = N,
-        m = re.match(r"^(\w+)\s*=\s*(\d+)\s*,?", line)
-        if m:
-            name = m.group(1)
-            current_value = int(m.group(2))
-            variants.append((name, current_value))
-            current_value += 1
-            continue
-
-        # Variant without explicit value: Name,
-        m = re.match(r"^(\w+)\s*,?$", line)
-        if m:
-            name = m.group(1)
-            variants.append((name, current_value))
-            current_value += 1
+    for m in VARIANT_RE.finditer(match.group(1)):
+        name, value = m.groups()
+        # Variant with explicit value (Name = N) resets the counter
+        if value is not None:
+            current_value = int(value)
+        variants.append((name.decode(), current_value))
+        current_value += 1
 
     return variants
 
@@ -243,21 +387,19 @@ def parse_enum_variants(source: str, enum_name: str) -> list[tuple[str, int]]:
 # Parsing: Monsters
 # ============================================================================
 
-def parse_monsters(root: Path) -> list[dict]:
+def parse_monsters(source: bytes) -> list[dict]:
     """
     Parse monster definitions from monsters.rs.
 
     Extracts MonsterType enum variants and correlates them with PerMonst
     entries to get display name, TUI symbol, and color.
     """
-    source = (root / "crates/nh-core/src/data/monsters.rs").read_text()
-
     # Parse enum variants, excluding the sentinel
     variants = parse_enum_variants(source, "MonsterType")
     variants = [(n, v) for n, v in variants if n != "NumMonsters"]
 
-    # Split on PerMonst entries to get per-monster data
-    entries_raw = re.split(r"PerMonst\s*\{", source)[1:]
+    # Locate PerMonst entries to get per-monster data
+    spans = entry_spans(PERMONST_START_RE, source)
 
     monsters = []
     for i, (variant_name, variant_value) in enumerate(variants):
@@ -265,20 +407,17 @@ def parse_monsters(root: Path) -> list[dict]:
         tui_color = "gray"
         display_name = camel_to_snake(variant_name).replace("_", " ")
 
-        if i < len(entries_raw):
-            entry = entries_raw[i]
+        if i < len(spans):
+            fields = scan_fields(PERMONST_FIELDS_RE, source, *spans[i])
 
-            name_match = re.search(r'name:\s*"([^"]*)"', entry)
-            if name_match:
-                display_name = name_match.group(1)
+            if "name" in fields:
+                display_name = fields["name"]
 
-            sym_match = re.search(r"symbol:\s*'(.)'", entry)
-            if sym_match:
-                tui_char = sym_match.group(1)
+            if "symbol" in fields:
+                tui_char = fields["symbol"]
 
-            color_match = re.search(r"color:\s*(\w+)", entry)
-            if color_match:
-                tui_color = resolve_color(color_match.group(1))
+            if "color" in fields:
+                tui_color = _resolve_color_fast(fields["color"])
 
         monsters.append({
             "monster_type": variant_value,
@@ -286,7 +425,7 @@ def parse_monsters(root: Path) -> list[dict]:
             "icon": {
                 "tui_char": tui_char,
                 "tui_color": tui_color,
-                "bevy_sprite": f"monsters/{camel_to_snake(variant_name)}.png",
+                "bevy_sprite": sprite_path(MONSTERS_PREFIX, camel_to_snake(variant_name)),
             },
         })
 
@@ -297,35 +436,19 @@ def parse_monsters(root: Path) -> list[dict]:
 # Parsing: Objects
 # ============================================================================
 
-def _parse_objclassdef(entry_text: str) -> dict[str, str | None]:
-    """Extract fields from a single ObjClassDef entry."""
+def _parse_objclassdef(source: bytes, start: int, end: int) -> dict[str, str | None]:
+    """Extract fields from the ObjClassDef entry at source[start:end]."""
     result: dict[str, str | None] = {
         "name": None,
         "class": None,
         "material": None,
         "color": None,
     }
-
-    name_match = re.search(r'name:\s*"([^"]*)"', entry_text)
-    if name_match:
-        result["name"] = name_match.group(1)
-
-    class_match = re.search(r"class:\s*ObjectClass::(\w+)", entry_text)
-    if class_match:
-        result["class"] = class_match.group(1)
-
-    mat_match = re.search(r"material:\s*Material::(\w+)", entry_text)
-    if mat_match:
-        result["material"] = mat_match.group(1)
-
-    color_match = re.search(r"color:\s*(\w+)", entry_text)
-    if color_match:
-        result["color"] = color_match.group(1)
-
+    result.update(scan_fields(OBJCLASSDEF_FIELDS_RE, source, start, end))
     return result
 
 
-def parse_objects(root: Path) -> tuple[list[dict], dict[str, str]]:
+def parse_objects(source: bytes) -> tuple[list[dict], dict[str, str]]:
     """
     Parse object definitions from objects.rs.
 
@@ -338,28 +461,31 @@ def parse_objects(root: Path) -> tuple[list[dict], dict[str, str]]:
         (objects_list, type_to_class): The list of parsed objects and a mapping
         from ObjectType variant name to its ObjectClass name (used by artifacts).
     """
-    source = (root / "crates/nh-core/src/data/objects.rs").read_text()
 
-    # Parse ObjectType enum to build variant_name → enum_value map
-    # (used for nicer sprite names when available, and for artifact class lookup)
+    # Parse ObjectType enum to build an enum_value → variant_name table
+    # (used for nicer sprite names when available, and for artifact class lookup).
+    # The OBJECTS loop looks it up by dense array position, so a list indexed by
+    # value is enough; positions without a named variant hold None.
     enum_variants = parse_enum_variants(source, "ObjectType")
-    enum_value_to_name: dict[int, str] = {}
+    max_value = max((value for _, value in enum_variants), default=-1)
+    enum_value_to_name: list[str | None] = [None] * (max_value + 1)
     for name, value in enum_variants:
         if name != "StrangeObject":
             enum_value_to_name[value] = name
 
     # Parse ALL ObjClassDef entries from the OBJECTS array by position.
     # Position 0 is StrangeObject (dummy), positions 1+ are real items.
-    entries_raw = re.split(r"ObjClassDef\s*\{", source)[1:]
+    spans = entry_spans(OBJCLASSDEF_START_RE, source)
 
     type_to_class: dict[str, str] = {}
     objects = []
+    class_symbol = CLASS_SYMBOLS.get
 
-    for array_idx, entry_text in enumerate(entries_raw):
+    for array_idx, (start, end) in enumerate(spans):
         if array_idx == 0:
             continue  # skip StrangeObject (position 0)
 
-        fields = _parse_objclassdef(entry_text)
+        fields = _parse_objclassdef(source, start, end)
         obj_name = fields["name"]
         obj_class = fields["class"]
         material = fields["material"]
@@ -369,11 +495,13 @@ def parse_objects(root: Path) -> tuple[list[dict], dict[str, str]]:
         if not obj_name or obj_name == "?":
             continue
 
-        tui_char = CLASS_SYMBOLS.get(obj_class, "?") if obj_class else "?"
-        tui_color = resolve_color(raw_color) if raw_color else "gray"
+        tui_char = class_symbol(obj_class, "?") if obj_class else "?"
+        tui_color = _resolve_color_fast(raw_color) if raw_color else "gray"
 
         # Check if this position has a named ObjectType enum variant
-        variant_name = enum_value_to_name.get(array_idx)
+        variant_name = (
+            enum_value_to_name[array_idx] if array_idx < len(enum_value_to_name) else None
+        )
         if variant_name and obj_class:
             type_to_class[variant_name] = obj_class
 
@@ -398,7 +526,7 @@ def parse_objects(root: Path) -> tuple[list[dict], dict[str, str]]:
             "icon": {
                 "tui_char": tui_char,
                 "tui_color": tui_color,
-                "bevy_sprite": f"items/{class_dir}/{sprite_name}.png",
+                "bevy_sprite": sprite_path(ITEMS_PREFIX + class_dir + "/", sprite_name),
             },
         })
 
@@ -422,22 +550,33 @@ def parse_objects(root: Path) -> tuple[list[dict], dict[str, str]]:
 # Parsing: Dungeon tiles
 # ============================================================================
 
-def parse_dungeon(root: Path) -> list[dict]:
+def _cell_icon(name: str) -> dict[str, str]:
+    """Build the icon for a CellType variant (unknown variants display as '?')."""
+    char, color = CELL_DISPLAY.get(name, ("?", "gray"))
+    return {
+        "tui_char": char,
+        "tui_color": color,
+        "bevy_sprite": sprite_path(DUNGEON_PREFIX, camel_to_snake(name)),
+    }
+
+
+# Icons for every known cell type, built once at import time
+CELL_ICONS: Mapping[str, dict[str, str]] = MappingProxyType(
+    {name: _cell_icon(name) for name in CELL_DISPLAY}
+)
+
+
+def parse_dungeon(source: bytes) -> list[dict]:
     """Parse CellType enum from cell.rs for dungeon tile mapping."""
-    source = (root / "crates/nh-core/src/dungeon/cell.rs").read_text()
     variants = parse_enum_variants(source, "CellType")
 
     tiles = []
+    cell_icon = CELL_ICONS.get
     for name, value in variants:
-        char, color = CELL_DISPLAY.get(name, ("?", "gray"))
         tiles.append({
             "cell_type": name,
             "value": value,
-            "icon": {
-                "tui_char": char,
-                "tui_color": color,
-                "bevy_sprite": f"dungeon/{camel_to_snake(name)}.png",
-            },
+            "icon": cell_icon(name) or _cell_icon(name),
         })
 
     return tiles
@@ -447,22 +586,32 @@ def parse_dungeon(root: Path) -> list[dict]:
 # Parsing: Traps
 # ============================================================================
 
-def parse_traps(root: Path) -> list[dict]:
+def _trap_icon(name: str) -> dict[str, str]:
+    """Build the icon for a TrapType variant (unknown variants are gray)."""
+    return {
+        "tui_char": "^",
+        "tui_color": TRAP_COLORS.get(name, "gray"),
+        "bevy_sprite": sprite_path(TRAPS_PREFIX, camel_to_snake(name)),
+    }
+
+
+# Icons for every known trap type, built once at import time
+TRAP_ICONS: Mapping[str, dict[str, str]] = MappingProxyType(
+    {name: _trap_icon(name) for name in TRAP_COLORS}
+)
+
+
+def parse_traps(source: bytes) -> list[dict]:
     """Parse TrapType enum from level.rs for trap mapping."""
-    source = (root / "crates/nh-core/src/dungeon/level.rs").read_text()
     variants = parse_enum_variants(source, "TrapType")
 
     traps = []
+    trap_icon = TRAP_ICONS.get
     for name, value in variants:
-        color = TRAP_COLORS.get(name, "gray")
         traps.append({
             "trap_type": name,
             "value": value,
-            "icon": {
-                "tui_char": "^",
-                "tui_color": color,
-                "bevy_sprite": f"traps/{camel_to_snake(name)}.png",
-            },
+            "icon": trap_icon(name) or _trap_icon(name),
         })
 
     return traps
@@ -472,39 +621,36 @@ def parse_traps(root: Path) -> list[dict]:
 # Parsing: Artifacts
 # ============================================================================
 
-def parse_artifacts(root: Path, type_to_class: dict[str, str]) -> list[dict]:
+def parse_artifacts(source: bytes, type_to_class: dict[str, str]) -> list[dict]:
     """
     Parse artifact definitions from artifacts.rs.
 
     Uses type_to_class to determine the correct TUI symbol for each
     artifact based on its base object type.
     """
-    source = (root / "crates/nh-core/src/data/artifacts.rs").read_text()
-
-    # Split on Artifact { to get individual entries
-    entries_raw = re.split(r"Artifact\s*\{", source)[1:]
+    # Locate each Artifact { to get individual entries
+    spans = entry_spans(ARTIFACT_START_RE, source)
 
     artifacts = []
-    for i, entry in enumerate(entries_raw):
-        name_match = re.search(r'name:\s*"([^"]*)"', entry)
-        otyp_match = re.search(r"otyp:\s*ObjectType::(\w+)", entry)
-        color_match = re.search(r"color:\s*(\w+)", entry)
+    class_symbol = CLASS_SYMBOLS.get
+    for i, (start, end) in enumerate(spans):
+        fields = scan_fields(ARTIFACT_FIELDS_RE, source, start, end)
 
-        if not name_match:
+        if "name" not in fields:
             continue
 
-        name = name_match.group(1)
-        base_type = otyp_match.group(1) if otyp_match else None
+        name = fields["name"]
+        base_type = fields.get("otyp")
 
         # Determine TUI color: use artifact color if specified, else white
-        raw_color = color_match.group(1) if color_match else "NO_COLOR"
-        tui_color = "white" if raw_color == "NO_COLOR" else resolve_color(raw_color)
+        raw_color = fields.get("color", "NO_COLOR")
+        tui_color = "white" if raw_color == "NO_COLOR" else _resolve_color_fast(raw_color)
 
         # Determine TUI char from the base object's class
         tui_char = ")"  # most artifacts are weapons
         if base_type and base_type in type_to_class:
             obj_class = type_to_class[base_type]
-            tui_char = CLASS_SYMBOLS.get(obj_class, ")")
+            tui_char = class_symbol(obj_class, ")")
 
         sprite_name = safe_sprite_name(name)
 
@@ -515,7 +661,7 @@ def parse_artifacts(root: Path, type_to_class: dict[str, str]) -> list[dict]:
             "icon": {
                 "tui_char": tui_char,
                 "tui_color": tui_color,
-                "bevy_sprite": f"artifacts/{sprite_name}.png",
+                "bevy_sprite": sprite_path(ARTIFACTS_PREFIX, sprite_name),
             },
         })
 
@@ -526,20 +672,10 @@ def parse_artifacts(root: Path, type_to_class: dict[str, str]) -> list[dict]:
 # Parsing: Player roles
 # ============================================================================
 
-def parse_player(root: Path) -> list[dict]:
+def parse_player(source: bytes) -> list[dict]:
     """Parse player role names from roles.rs."""
-    source = (root / "crates/nh-core/src/data/roles.rs").read_text()
-
-    # Extract unique role names from RoleName::new("Name", ...)
-    role_names = re.findall(r'name:\s*RoleName::new\("(\w+)"', source)
-
-    # Deduplicate while preserving order
-    seen: set[str] = set()
-    unique_roles: list[str] = []
-    for name in role_names:
-        if name not in seen:
-            seen.add(name)
-            unique_roles.append(name)
+    # Extract unique role names from RoleName::new("Name", ...), preserving order
+    unique_roles = dict.fromkeys(m.group(1).decode() for m in ROLE_RE.finditer(source))
 
     players = []
     for role in unique_roles:
@@ -548,13 +684,43 @@ def parse_player(root: Path) -> list[dict]:
             "icon": {
                 "tui_char": "@",
                 "tui_color": "white",
-                "bevy_sprite": f"player/{camel_to_snake(role)}.png",
+                "bevy_sprite": sprite_path(PLAYER_PREFIX, camel_to_snake(role)),
             },
         })
 
     return players
 
 
+# ============================================================================
+# Output
+# ============================================================================
+
+def write_mapping(output: Path, mapping: dict[str, list[dict]]) -> None:
+    """
+    Write the mapping as 2-space indented JSON.
+
+    With orjson, each top-level section is serialized and written on its own,
+    so only one section's encoded bytes are held in memory at a time. The
+    section is re-indented one level to sit inside the outer object, which
+    gives the same bytes as dumping the whole mapping at once.
+    """
+    if orjson is None:
+        with open(output, "w") as f:
+            json.dump(mapping, f, indent=2, ensure_ascii=False)
+        return
+
+    with open(output, "wb") as f:
+        f.write(b"{")
+        sep = b"\n  "
+        for key, section in mapping.items():
+            f.write(sep)
+            f.write(orjson.dumps(key))
+            f.write(b": ")
+            f.write(orjson.dumps(section, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+            sep = b",\n  "
+        f.write(b"\n}" if mapping else b"}")
+
+
 # ============================================================================
 # Main
 # ============================================================================
@@ -578,30 +744,42 @@ def main():
     print(f"Output:       {output}")
     print()
 
-    # Parse objects first since artifacts need the type->class mapping
-    print("Parsing objects...")
-    objects, type_to_class = parse_objects(root)
-    print(f"  {len(objects)} objects")
+    sources = load_sources(root)
+
+    # The source files are independent, so parse them concurrently. Artifacts
+    # need the type->class mapping from objects and are submitted once it is
+    # ready. Progress is printed in a fixed order as each result is collected.
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        f_objects = pool.submit(parse_objects, sources["objects"])
+        f_monsters = pool.submit(parse_monsters, sources["monsters"])
+        f_dungeon = pool.submit(parse_dungeon, sources["cell"])
+        f_traps = pool.submit(parse_traps, sources["level"])
+        f_player = pool.submit(parse_player, sources["roles"])
+
+        print("Parsing objects...")
+        objects, type_to_class = f_objects.result()
+        f_artifacts = pool.submit(parse_artifacts, sources["artifacts"], type_to_class)
+        print(f"  {len(objects)} objects")
 
-    print("Parsing monsters...")
-    monsters = parse_monsters(root)
-    print(f"  {len(monsters)} monsters")
+        print("Parsing monsters...")
+        monsters = f_monsters.result()
+        print(f"  {len(monsters)} monsters")
 
-    print("Parsing dungeon tiles...")
-    dungeon = parse_dungeon(root)
-    print(f"  {len(dungeon)} dungeon tile types")
+        print("Parsing dungeon tiles...")
+        dungeon = f_dungeon.result()
+        print(f"  {len(dungeon)} dungeon tile types")
 
-    print("Parsing traps...")
-    traps = parse_traps(root)
-    print(f"  {len(traps)} trap types")
+        print("Parsing traps...")
+        traps = f_traps.result()
+        print(f"  {len(traps)} trap types")
 
-    print("Parsing artifacts...")
-    artifacts = parse_artifacts(root, type_to_class)
-    print(f"  {len(artifacts)} artifacts")
+        print("Parsing artifacts...")
+        artifacts = f_artifacts.result()
+        print(f"  {len(artifacts)} artifacts")
 
-    print("Parsing player roles...")
-    player = parse_player(root)
-    print(f"  {len(player)} player roles")
+        print("Parsing player roles...")
+        player = f_player.result()
+        print(f"  {len(player)} player roles")
 
     mapping = {
         "items": objects,
@@ -616,8 +794,7 @@ def main():
     print(f"\nTotal entries: {total}")
 
     output.parent.mkdir(parents=True, exist_ok=True)
-    with open(output, "w") as f:
-        json.dump(mapping, f, indent=2, ensure_ascii=False)
+    write_mapping(output, mapping)
     print(f"Written to {output}")
 
 
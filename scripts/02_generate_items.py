@@ -2,7 +2,25 @@ import json
 import argparse
 import os
 import base64
+import binascii
+import email.utils
+import hashlib
+import itertools
+import mmap
+import multiprocessing
+import re
+import shutil
+import threading
 import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib json module
+    orjson = None
 
 # Common style block to ensure consistency across all icons
 STYLE_MODIFIER = (
@@ -11,11 +29,103 @@ STYLE_MODIFIER = (
     "clean centered composition, white background (to be transparent)."
 )
 
+# Splits CamelCase words ("LongSword" -> "Long Sword")
+CAMEL_SPLIT_RE = re.compile(r"([a-z])([A-Z])")
+
 
 # ============================================================================
 # Prompt generation per entity category
 # ============================================================================
 
+# Class-specific flavor appended to item prompts
+ITEM_CLASS_HINTS = {
+    "Weapon": "medieval fantasy weapon",
+    "Armor": "piece of medieval armor",
+    "Potion": "glowing magical potion bottle",
+    "Scroll": "ancient parchment scroll",
+    "Spellbook": "leather-bound magical spellbook",
+    "Wand": "thin magical wand",
+    "Ring": "ornate magical ring",
+    "Amulet": "mystical amulet on a chain",
+    "Food": "food item",
+    "Gem": "precious gemstone",
+    "Tool": "adventuring tool",
+    "Coin": "pile of gold coins",
+    "Rock": "stone or rock",
+    "Ball": "heavy iron ball and chain",
+    "Chain": "iron chain",
+    "Venom": "splash of venom",
+}
+
+# Map cell types to descriptive tile prompts
+TILE_DESCRIPTIONS = {
+    "Stone": "solid stone wall texture, dark grey rock",
+    "VWall": "vertical dungeon wall, stone bricks",
+    "HWall": "horizontal dungeon wall, stone bricks",
+    "TLCorner": "top-left corner of a stone dungeon wall",
+    "TRCorner": "top-right corner of a stone dungeon wall",
+    "BLCorner": "bottom-left corner of a stone dungeon wall",
+    "BRCorner": "bottom-right corner of a stone dungeon wall",
+    "CrossWall": "cross-shaped intersection of dungeon walls",
+    "TUWall": "T-shaped wall junction pointing up",
+    "TDWall": "T-shaped wall junction pointing down",
+    "TLWall": "T-shaped wall junction pointing left",
+    "TRWall": "T-shaped wall junction pointing right",
+    "DBWall": "raised drawbridge, wooden planks with chains",
+    "Tree": "gnarled underground tree with pale leaves",
+    "SecretDoor": "stone wall with a hidden door outline",
+    "SecretCorridor": "hidden passageway behind false wall",
+    "Pool": "still pool of dark water on dungeon floor",
+    "Moat": "deep moat of murky water",
+    "Water": "underground river or lake, dark water",
+    "DrawbridgeUp": "raised drawbridge with chains",
+    "Lava": "pool of glowing molten lava",
+    "IronBars": "vertical iron bars blocking passage",
+    "Door": "wooden dungeon door with iron hinges",
+    "Corridor": "narrow stone corridor, dim lighting",
+    "Room": "stone dungeon floor tiles",
+    "Stairs": "stone staircase leading down into darkness",
+    "Ladder": "wooden ladder descending into darkness",
+    "Fountain": "ornate stone fountain with magical water",
+    "Throne": "ornate golden throne on a raised dais",
+    "Sink": "stone basin with dripping water",
+    "Grave": "stone gravestone with carved inscription",
+    "Altar": "sacrificial stone altar with runes",
+    "Ice": "slippery ice-covered dungeon floor",
+    "DrawbridgeDown": "lowered drawbridge, wooden planks",
+    "Air": "open sky seen from above, clouds below",
+    "Cloud": "thick magical clouds, ethereal mist",
+    "Wall": "solid stone dungeon wall",
+    "Vault": "polished stone floor of a treasure vault",
+}
+
+# Map trap types to descriptive prompts
+TRAP_DESCRIPTIONS = {
+    "Arrow": "hidden arrow trap with trigger mechanism",
+    "Dart": "concealed dart trap in dungeon wall",
+    "RockFall": "unstable ceiling ready to collapse rocks",
+    "Squeaky": "squeaky floorboard trap",
+    "BearTrap": "steel bear trap with jagged teeth",
+    "LandMine": "hidden land mine buried in floor",
+    "RollingBoulder": "large boulder ready to roll down a slope",
+    "SleepingGas": "vent releasing sleeping gas clouds",
+    "RustTrap": "trap that sprays corrosive rust liquid",
+    "FireTrap": "fire jet trap shooting flames from floor",
+    "Pit": "concealed pit trap in dungeon floor",
+    "SpikedPit": "pit trap lined with sharp spikes",
+    "Hole": "hole in the dungeon floor",
+    "TrapDoor": "hidden trapdoor in the floor",
+    "Teleport": "glowing magical teleportation rune on floor",
+    "LevelTeleport": "swirling portal of magical energy",
+    "MagicPortal": "shimmering dimensional portal",
+    "Web": "giant spider web stretching across passage",
+    "Statue": "stone statue that is actually a trap",
+    "MagicTrap": "glowing magical rune trap on floor",
+    "AntiMagic": "anti-magic field emanating from floor rune",
+    "Polymorph": "chaotic polymorph energy trap on floor",
+}
+
+
 def generate_item_prompt(entry, resolution):
     """Generate a prompt for an item (weapon, armor, potion, etc.)."""
     name = entry.get("name", "mysterious object")
@@ -23,30 +133,18 @@ def generate_item_prompt(entry, resolution):
     material = identifier.get("material")
     item_class = identifier.get("class", "")
 
-    parts = [f"a {name}"]
-    if material:
-        parts.append(f"made of {material.lower()}")
-
-    # Add class-specific flavor
-    class_hints = {
-        "Weapon": "medieval fantasy weapon",
-        "Armor": "piece of medieval armor",
-        "Potion": "glowing magical potion bottle",
-        "Scroll": "ancient parchment scroll",
-        "Spellbook": "leather-bound magical spellbook",
-        "Wand": "thin magical wand",
-        "Ring": "ornate magical ring",
-        "Amulet": "mystical amulet on a chain",
-        "Food": "food item",
-        "Gem": "precious gemstone",
-        "Tool": "adventuring tool",
-        "Coin": "pile of gold coins",
-        "Rock": "stone or rock",
-        "Ball": "heavy iron ball and chain",
-        "Chain": "iron chain",
-        "Venom": "splash of venom",
-    }
-    hint = class_hints.get(item_class)
+    template = _item_template(item_class, resolution, bool(material))
+    return template.format(name=name, material=material.lower() if material else "")
+
+
+@cache
+def _item_template(item_class, resolution, has_material):
+    """Build the item prompt template with {name} and {material} placeholders."""
+    parts = ["a {name}"]
+    if has_material:
+        parts.append("made of {material}")
+
+    hint = ITEM_CLASS_HINTS.get(item_class)
     if hint:
         parts.append(hint)
 
@@ -56,7 +154,11 @@ def generate_item_prompt(entry, resolution):
 
 def generate_monster_prompt(entry, resolution):
     """Generate a prompt for a monster."""
-    name = entry.get("name", "monster")
+    return _monster_prompt(entry.get("name", "monster"), resolution)
+
+
+@cache
+def _monster_prompt(name, resolution):
     return (
         f"Create a {name} creature as a {resolution}x{resolution} game icon, "
         f"fantasy RPG monster portrait, facing forward. {STYLE_MODIFIER}"
@@ -65,91 +167,36 @@ def generate_monster_prompt(entry, resolution):
 
 def generate_dungeon_prompt(entry, resolution):
     """Generate a prompt for a dungeon tile."""
-    cell_type = entry.get("cell_type", "floor")
-    # Map cell types to descriptive tile prompts
-    tile_descriptions = {
-        "Stone": "solid stone wall texture, dark grey rock",
-        "VWall": "vertical dungeon wall, stone bricks",
-        "HWall": "horizontal dungeon wall, stone bricks",
-        "TLCorner": "top-left corner of a stone dungeon wall",
-        "TRCorner": "top-right corner of a stone dungeon wall",
-        "BLCorner": "bottom-left corner of a stone dungeon wall",
-        "BRCorner": "bottom-right corner of a stone dungeon wall",
-        "CrossWall": "cross-shaped intersection of dungeon walls",
-        "TUWall": "T-shaped wall junction pointing up",
-        "TDWall": "T-shaped wall junction pointing down",
-        "TLWall": "T-shaped wall junction pointing left",
-        "TRWall": "T-shaped wall junction pointing right",
-        "DBWall": "raised drawbridge, wooden planks with chains",
-        "Tree": "gnarled underground tree with pale leaves",
-        "SecretDoor": "stone wall with a hidden door outline",
-        "SecretCorridor": "hidden passageway behind false wall",
-        "Pool": "still pool of dark water on dungeon floor",
-        "Moat": "deep moat of murky water",
-        "Water": "underground river or lake, dark water",
-        "DrawbridgeUp": "raised drawbridge with chains",
-        "Lava": "pool of glowing molten lava",
-        "IronBars": "vertical iron bars blocking passage",
-        "Door": "wooden dungeon door with iron hinges",
-        "Corridor": "narrow stone corridor, dim lighting",
-        "Room": "stone dungeon floor tiles",
-        "Stairs": "stone staircase leading down into darkness",
-        "Ladder": "wooden ladder descending into darkness",
-        "Fountain": "ornate stone fountain with magical water",
-        "Throne": "ornate golden throne on a raised dais",
-        "Sink": "stone basin with dripping water",
-        "Grave": "stone gravestone with carved inscription",
-        "Altar": "sacrificial stone altar with runes",
-        "Ice": "slippery ice-covered dungeon floor",
-        "DrawbridgeDown": "lowered drawbridge, wooden planks",
-        "Air": "open sky seen from above, clouds below",
-        "Cloud": "thick magical clouds, ethereal mist",
-        "Wall": "solid stone dungeon wall",
-        "Vault": "polished stone floor of a treasure vault",
-    }
-    desc = tile_descriptions.get(cell_type, f"dungeon {cell_type.lower()} tile")
+    return _dungeon_prompt(entry.get("cell_type", "floor"), resolution)
+
+
+@cache
+def _dungeon_prompt(cell_type, resolution):
+    desc = TILE_DESCRIPTIONS.get(cell_type, f"dungeon {cell_type.lower()} tile")
     return f"Create a {desc} as a {resolution}x{resolution} top-down dungeon tile. {STYLE_MODIFIER}"
 
 
 def generate_trap_prompt(entry, resolution):
     """Generate a prompt for a trap."""
-    trap_type = entry.get("trap_type", "trap")
-    trap_descriptions = {
-        "Arrow": "hidden arrow trap with trigger mechanism",
-        "Dart": "concealed dart trap in dungeon wall",
-        "RockFall": "unstable ceiling ready to collapse rocks",
-        "Squeaky": "squeaky floorboard trap",
-        "BearTrap": "steel bear trap with jagged teeth",
-        "LandMine": "hidden land mine buried in floor",
-        "RollingBoulder": "large boulder ready to roll down a slope",
-        "SleepingGas": "vent releasing sleeping gas clouds",
-        "RustTrap": "trap that sprays corrosive rust liquid",
-        "FireTrap": "fire jet trap shooting flames from floor",
-        "Pit": "concealed pit trap in dungeon floor",
-        "SpikedPit": "pit trap lined with sharp spikes",
-        "Hole": "hole in the dungeon floor",
-        "TrapDoor": "hidden trapdoor in the floor",
-        "Teleport": "glowing magical teleportation rune on floor",
-        "LevelTeleport": "swirling portal of magical energy",
-        "MagicPortal": "shimmering dimensional portal",
-        "Web": "giant spider web stretching across passage",
-        "Statue": "stone statue that is actually a trap",
-        "MagicTrap": "glowing magical rune trap on floor",
-        "AntiMagic": "anti-magic field emanating from floor rune",
-        "Polymorph": "chaotic polymorph energy trap on floor",
-    }
-    desc = trap_descriptions.get(trap_type, f"dungeon {trap_type.lower()} trap")
+    return _trap_prompt(entry.get("trap_type", "trap"), resolution)
+
+
+@cache
+def _trap_prompt(trap_type, resolution):
+    desc = TRAP_DESCRIPTIONS.get(trap_type, f"dungeon {trap_type.lower()} trap")
     return f"Create a {desc} as a {resolution}x{resolution} game icon. {STYLE_MODIFIER}"
 
 
 def generate_artifact_prompt(entry, resolution):
     """Generate a prompt for a legendary artifact."""
-    name = entry.get("name", "artifact")
-    base_type = entry.get("base_type", "")
+    return _artifact_prompt(entry.get("name", "artifact"), entry.get("base_type", ""), resolution)
+
+
+@cache
+def _artifact_prompt(name, base_type, resolution):
     base_desc = base_type.lower() if base_type else "weapon"
     # Convert CamelCase to readable
-    import re
-    base_desc = re.sub(r"([a-z])([A-Z])", r"\1 \2", base_desc).lower()
+    base_desc = CAMEL_SPLIT_RE.sub(r"\1 \2", base_desc).lower()
     return (
         f"Create the legendary artifact \"{name}\" (a magical {base_desc}) "
         f"as a {resolution}x{resolution} game icon, glowing with power, "
@@ -159,7 +206,11 @@ def generate_artifact_prompt(entry, resolution):
 
 def generate_player_prompt(entry, resolution):
     """Generate a prompt for a player role."""
-    role = entry.get("role", "adventurer")
+    return _player_prompt(entry.get("role", "adventurer"), resolution)
+
+
+@cache
+def _player_prompt(role, resolution):
     return (
         f"Create a {role} character portrait as a {resolution}x{resolution} game icon, "
         f"fantasy RPG hero, facing forward. {STYLE_MODIFIER}"
@@ -176,51 +227,515 @@ PROMPT_GENERATORS = {
     "player": generate_player_prompt,
 }
 
+# Fixed category order; the main loop dispatches by index into PROMPT_FNS
+CATEGORIES = tuple(PROMPT_GENERATORS)
+CATEGORY_INDEX = {category: i for i, category in enumerate(CATEGORIES)}
+PROMPT_FNS = tuple(PROMPT_GENERATORS.values())
+
 
 # ============================================================================
 # API / generation backends
 # ============================================================================
 
-def call_api(url, headers, payload, max_retries=5):
-    """Call the Google API with exponential backoff for rate limiting."""
+def make_session(pool_size):
+    """
+    Create a keep-alive HTTP session for the Google API.
+
+    All requests go to the same host, so one pooled session sized to the
+    request concurrency lets every call after the first reuse an open
+    TCP+TLS connection. Connection errors and 5xx responses are retried
+    with backoff by urllib3; rate limits (429) are left to call_api, which
+    reads Google's retryDelay hint and slows the TokenBucket.
+    """
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=4,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["POST"],
+        raise_on_status=False,
+        # Otherwise urllib3 also retries any 429 carrying Retry-After and
+        # sleeps for as long as it says, bypassing call_api
+        respect_retry_after_header=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
 
-    last_response = None
-    for i in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            last_response = response
 
-            if response.status_code == 429:
-                wait_time = (2 ** i) + 5
-                print(f"  Rate limited (429). Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-                continue
+# How long a 429 keeps the request rate halved
+RATE_PENALTY_SECONDS = 60
 
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` acquisitions per second on
+    average, with bursts of up to `burst`.
+
+    Throttling before sending keeps the request rate under quota, so the
+    429 path (a wasted round-trip plus a backoff sleep) is rarely taken.
+    When one is, penalize() halves the rate until RATE_PENALTY_SECONDS pass
+    without another.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.restore_at = None
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.restore_at is not None and now >= self.restore_at:
+                    self.rate = self.base_rate
+                    self.restore_at = None
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.cond.wait((1 - self.tokens) / self.rate)
+
+    def penalize(self):
+        """Halve the rate after a 429 (down to 1/64 of the base rate)."""
+        with self.cond:
+            self.rate = max(self.rate / 2, self.base_rate / 64)
+            self.restore_at = time.monotonic() + RATE_PENALTY_SECONDS
+
+
+def dumps_json(obj):
+    """Serialize a request body to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data):
+    """Parse JSON bytes (a response body or the mapping file)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Directory under --output holding PromptCache images
+PROMPT_CACHE_DIR = ".prompt_cache"
+
+# Upper bound on a single rate-limit sleep, whatever the server asks for
+MAX_RETRY_WAIT = 120
+
+# (connect, read) timeouts in seconds. A host that never answers the
+# handshake is given up on quickly and retried by the session; the read
+# timeout bounds each wait for the next bytes, not the whole response.
+REQUEST_TIMEOUT = (10, 60)
+
+
+def retry_after_hint(response):
+    """
+    Seconds the server asks us to wait after a 429, or None.
+
+    Checks the Retry-After header (delta-seconds or HTTP-date), then the
+    google.rpc.RetryInfo `retryDelay` (e.g. "23s") in the JSON error body.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+                return max(0.0, when.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        details = loads_json(response.content).get("error", {}).get("details", [])
+    except ValueError:
+        return None
+    for detail in details:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return float(delay[:-1])
+            except ValueError:
+                pass
+    return None
+
+
+def call_api(session, url, headers, payload, max_retries=5, limiter=None):
+    """
+    Call the Google API, retrying rate limits (429).
+
+    On 429 the server's Retry-After/retryDelay hint is honored, with an
+    exponential backoff as the floor and MAX_RETRY_WAIT as the cap. Every
+    attempt, retries included, first takes a token from `limiter` if given,
+    and a 429 also slows the limiter down for everyone. Network errors and
+    5xx are retried inside the session (see make_session) and raise once
+    those retries run out. The payload is serialized once and reused across
+    retries; `headers` must set the JSON Content-Type.
+    """
+    data = dumps_json(payload)
+    response = None
+    for i in range(max_retries):
+        if limiter is not None:
+            limiter.acquire()
+        response = session.post(url, headers=headers, data=data, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 429:
             return response
-        except requests.exceptions.RequestException as e:
-            print(f"  Network error: {e}")
-            if i == max_retries - 1:
-                raise e
-            time.sleep(2 ** i)
 
-    return last_response
+        if limiter is not None:
+            limiter.penalize()
+        hint = retry_after_hint(response)
+        wait_time = min(max(hint or 0, 2 ** i), MAX_RETRY_WAIT)
+        print(f"  Rate limited (429). Retrying in {wait_time:g}s...")
+        time.sleep(wait_time)
 
+    return response
 
-def generate_local(prompt, target_path, resolution, seed, flux_model):
-    """Generate an image locally using mflux Flux1Schnell."""
-    image = flux_model.generate_image(
+
+def load_flux_model():
+    """Load the mflux Flux1Schnell model used by the local backend."""
+    from mflux.models.flux.variants.txt2img.flux import Flux1  # type: ignore[import-not-found]
+
+    print("Loading Flux1Schnell model (quantize=8)...")
+    return Flux1(quantize=8)
+
+
+def render_local(prompt, resolution, seed, flux_model):
+    """Run Flux1Schnell inference and return the generated image."""
+    return flux_model.generate_image(
         seed=seed,
         prompt=prompt,
         num_inference_steps=4,
         height=resolution,
         width=resolution,
     )
-    image.save(target_path)
 
 
-def generate_google(prompt, target_path, reference_b64, api_key, model):
-    """Generate an image using Google Gemini/Imagen API."""
+def generate_local(prompt, target_path, resolution, seed, flux_model):
+    """Generate an image locally using mflux Flux1Schnell."""
+    render_local(prompt, resolution, seed, flux_model).save(target_path)
+
+
+# Per-process model for local worker pools (set by _init_flux_worker)
+_worker_flux_model = None
+
+
+def _init_flux_worker():
+    global _worker_flux_model
+    _worker_flux_model = load_flux_model()
+
+
+def _flux_worker_job(job):
+    sprite_path, prompt, target_path, resolution, seed = job
+    try:
+        generate_local(prompt, target_path, resolution, seed, _worker_flux_model)
+        return sprite_path, target_path, None
+    except Exception as e:  # noqa: BLE001 - reported back per sprite, like the serial loop
+        return sprite_path, target_path, str(e)
+
+
+def generate_local_batch(jobs, resolution, workers):
+    """
+    Generate local images for `jobs`, a list of (sprite_path, prompt,
+    target_path, seed) tuples.
+
+    With one worker the model is loaded in-process and PNG encoding runs on a
+    background thread, overlapping with the next inference. With more workers
+    each spawned process loads its own model once and pulls jobs from a pool
+    (only useful with more than one accelerator; MPS is not multi-process safe).
+    """
+    if workers > 1:
+        work = [(sprite_path, prompt, target_path, resolution, seed)
+                for sprite_path, prompt, target_path, seed in jobs]
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_flux_worker) as pool:
+            for sprite_path, target_path, error in pool.imap_unordered(_flux_worker_job, work):
+                if error is None:
+                    print(f"  Saved to {target_path}")
+                else:
+                    print(f"  Error generating {sprite_path}: {error}")
+        return
+
+    flux_model = load_flux_model()
+    with ThreadPoolExecutor(max_workers=1) as saver:
+        pending = None
+        for sprite_path, prompt, target_path, seed in jobs:
+            try:
+                image = render_local(prompt, resolution, seed, flux_model)
+            except Exception as e:  # noqa: BLE001 - one failed render must not stop the batch
+                print(f"  Error generating {sprite_path}: {e}")
+                continue
+            if pending is not None:
+                _report_save(*pending)
+            pending = (saver.submit(image.save, target_path), sprite_path, target_path)
+        if pending is not None:
+            _report_save(*pending)
+
+
+def _report_save(future, sprite_path, target_path):
+    try:
+        future.result()
+        print(f"  Saved to {target_path}")
+        return True
+    except Exception as e:  # noqa: BLE001 - write errors are reported per sprite
+        print(f"  Error generating {sprite_path}: {e}")
+        return False
+
+
+@contextmanager
+def map_reference(path):
+    """
+    Yield the reference image at `path` as a read-only mmap (None without
+    a path), unmapped on exit.
+
+    Mapped rather than read: hashing, uploading and base64 all take the
+    mapping directly, and compact_reference() hands it to Pillow as a file,
+    so none of them makes a bytes copy of the whole file.
+    """
+    if not path:
+        yield None
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image:
+        yield image
+
+
+def compact_reference(image_bytes):
+    """
+    Return (data, mime_type) for the reference image, re-encoded as lossless
+    WEBP when Pillow is installed and that comes out smaller than the PNG.
+
+    Lossless keeps every pixel of the style reference intact; the request
+    only gets smaller. Without Pillow or its WEBP support, or if the file
+    is not a readable image, the PNG is sent unchanged.
+    """
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return image_bytes, "image/png"
+    if not features.check("webp"):
+        return image_bytes, "image/png"
+
+    import io
+
+    if isinstance(image_bytes, mmap.mmap):
+        # Pillow reads the mapping as a file, without a bytes copy of it
+        image_bytes.seek(0)
+        source = image_bytes
+    else:
+        source = io.BytesIO(image_bytes)
+    try:
+        with Image.open(source) as im:
+            buf = io.BytesIO()
+            im.save(buf, "WEBP", lossless=True, method=6)
+    except (KeyError, OSError, ValueError) as e:
+        # KeyError/OSError: a Pillow build without a usable WEBP encoder
+        print(f"  Keeping PNG reference: {e}")
+        return image_bytes, "image/png"
+    if buf.tell() >= len(image_bytes):
+        return image_bytes, "image/png"
+    return buf.getvalue(), "image/webp"
+
+
+def upload_reference(session, image_bytes, api_key, mime_type="image/png"):
+    """
+    Upload the reference image to the Gemini Files API and return its URI.
+
+    Uses the two-step resumable upload (start, then upload+finalize in one
+    request). Returns None if either step fails.
+    """
+    import requests
+
+    url = "https://generativelanguage.googleapis.com/upload/v1beta/files"
+    try:
+        start = session.post(
+            url,
+            headers={
+                "X-goog-api-key": api_key,
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(len(image_bytes)),
+                "X-Goog-Upload-Header-Content-Type": mime_type,
+                "Content-Type": "application/json",
+            },
+            data=dumps_json({"file": {"display_name": "reference"}}),
+            timeout=REQUEST_TIMEOUT,
+        )
+        upload_url = start.headers.get("X-Goog-Upload-URL")
+        if start.status_code != 200 or not upload_url:
+            print(f"  Reference upload failed: {start.status_code}")
+            return None
+
+        response = session.post(
+            upload_url,
+            headers={
+                "X-Goog-Upload-Offset": "0",
+                "X-Goog-Upload-Command": "upload, finalize",
+            },
+            data=image_bytes,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code != 200:
+            print(f"  Reference upload failed: {response.status_code}")
+            return None
+        return loads_json(response.content).get("file", {}).get("uri")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"  Reference upload failed: {e}")
+        return None
+
+
+def reference_part(session, image_bytes, api_key, model):
+    """
+    Build the request part carrying the reference image.
+
+    Gemini can reference an uploaded file by URI, so the image is sent once
+    rather than base64-inlined in every request. Either way it goes through
+    compact_reference() first. Imagen ignores the reference and gets None;
+    if the upload fails the image is inlined as before, as a pre-serialized
+    orjson.Fragment when orjson supports it.
+    """
+    if not image_bytes or is_imagen(model):
+        return None
+
+    image_bytes, mime_type = compact_reference(image_bytes)
+    file_uri = upload_reference(session, image_bytes, api_key, mime_type)
+    if file_uri:
+        print(f"Uploaded reference image: {file_uri}")
+        return {"file_data": {"mime_type": mime_type, "file_uri": file_uri}}
+
+    print("Falling back to inline reference image")
+    part = {
+        "inline_data": {
+            "mime_type": mime_type,
+            "data": base64.b64encode(image_bytes).decode("utf-8"),
+        }
+    }
+    # Serialize the large base64 string once; every request then splices
+    # the same JSON bytes in instead of re-encoding them
+    if orjson is not None and hasattr(orjson, "Fragment"):
+        return orjson.Fragment(orjson.dumps(part))
+    return part
+
+
+def _write_image(target_path, image_bytes):
+    # Unlink first: the old file may be a hard link into the prompt cache,
+    # which must not be overwritten in place
+    try:
+        os.unlink(target_path)
+    except FileNotFoundError:
+        pass
+    # One reserved extent and raw write()s: no Python buffer in between
+    fd = os.open(target_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, "posix_fallocate") and image_bytes:
+            try:
+                os.posix_fallocate(fd, 0, len(image_bytes))
+            except OSError:
+                pass  # not supported by this filesystem
+        view = memoryview(image_bytes)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def link_or_copy(src, dst):
+    """Hard-link src to dst (replacing dst), copying across filesystems."""
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class PromptCache:
+    """
+    Generated PNGs kept under the output directory, keyed by a hash of the
+    prompt, model and reference image, so an identical request is never
+    paid for twice, in this run or a later one. The files are the index.
+
+    With `refresh` (--force) nothing is served from the cache; the images
+    generated in this run replace whatever entries it had.
+    """
+
+    def __init__(self, cache_dir, model, reference_image, refresh=False):
+        self.dir = cache_dir
+        self.refresh = refresh
+        os.makedirs(cache_dir, exist_ok=True)
+        ref = hashlib.blake2b(reference_image, digest_size=16).hexdigest() if reference_image else ""
+        self.salt = f"{model}|{ref}|"
+
+    def path(self, prompt):
+        key = hashlib.blake2b((self.salt + prompt).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.dir, f"{key}.png")
+
+    def fetch(self, prompt, target_path):
+        """Link the cached image for prompt to target_path; False on a miss."""
+        if self.refresh:
+            return False
+        cached = self.path(prompt)
+        if not os.path.exists(cached):
+            return False
+        link_or_copy(cached, target_path)
+        return True
+
+    def store(self, prompt, target_path):
+        """Make the freshly generated target_path the cached image for prompt."""
+        link_or_copy(target_path, self.path(prompt))
+
+
+def _save_image(target_path, image_bytes, writer):
+    """Write the PNG now, or on `writer` (returning the write future)."""
+    if writer is not None:
+        return writer.submit(_write_image, target_path, image_bytes)
+    _write_image(target_path, image_bytes)
+    return True
+
+
+def _print_http_error(response):
+    if response is None:
+        print("  Error: No response from API (max retries reached)")
+    else:
+        print(f"  Error: {response.status_code}")
+        print(f"  Response: {response.text}")
+
+
+# Request fields that never change between prompts; every payload shares
+# these objects instead of building its own copy
+GEMINI_GENERATION_CONFIG = {"response_modalities": ["IMAGE"]}
+IMAGEN_PARAMETERS = {
+    "sampleCount": 1,
+    "aspectRatio": "1:1",
+    "includeSafetyAttributes": False,
+    "includeRaiReason": True,
+}
+
+
+def is_imagen(model):
+    """Imagen models use :predict; everything else goes to Gemini."""
+    return "imagen" in model.lower()
+
+
+def generate_gemini(session, prompt, target_path, reference, api_key, model, writer=None, limiter=None):
+    """
+    Generate an image using the Gemini generateContent API.
+
+    `reference` is the request part built by reference_part(), or None.
+    With a `writer` executor the PNG is written in the background and the
+    write future is returned in place of True. Imagen models go through
+    generate_imagen() instead.
+    """
     url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
     headers = {
         "Content-Type": "application/json",
@@ -228,87 +743,264 @@ def generate_google(prompt, target_path, reference_b64, api_key, model):
     }
 
     parts = []
-    if reference_b64:
-        parts.append({
-            "inline_data": {
-                "mime_type": "image/png",
-                "data": reference_b64,
-            }
-        })
+    if reference:
+        parts.append(reference)
         parts.append({"text": f"Generate a new item icon matching the style of the provided reference image. The new item is: {prompt}"})
     else:
         parts.append({"text": prompt})
 
-    if "imagen" in model.lower():
-        payload = {
-            "instances": [{"prompt": prompt}],
-            "parameters": {
-                "sampleCount": 1,
-                "aspectRatio": "1:1",
-                "includeSafetyAttributes": False,
-            },
-        }
-    else:
-        payload = {
-            "contents": [{"parts": parts}],
-            "generationConfig": {"response_modalities": ["IMAGE"]},
-        }
-
-    response = call_api(url, headers, payload)
+    payload = {
+        "contents": [{"parts": parts}],
+        "generationConfig": GEMINI_GENERATION_CONFIG,
+    }
 
-    if response is None:
-        print(f"  Error: No response from API (max retries reached)")
+    response = call_api(session, url, headers, payload, limiter=limiter)
+    if response is None or response.status_code != 200:
+        _print_http_error(response)
         return False
 
-    if response.status_code != 200:
-        print(f"  Error: {response.status_code}")
-        print(f"  Response: {response.text}")
-        return False
-
-    result = response.json()
+    result = loads_json(response.content)
 
-    candidates = result.get("candidates", [])
-    if candidates:
-        content_parts = candidates[0].get("content", {}).get("parts", [])
-        for part in content_parts:
-            if "inlineData" in part:
-                img_data = part["inlineData"].get("data")
-                if img_data:
-                    image_bytes = base64.b64decode(img_data)
-                    with open(target_path, 'wb') as img_f:
-                        img_f.write(image_bytes)
-                    return True
+    # Stop at the first part carrying image data
+    candidates = result.get("candidates")
+    content = candidates[0].get("content") if candidates else None
+    for part in (content.get("parts") or ()) if content else ():
+        inline = part.get("inlineData")
+        img_data = inline.get("data") if inline else None
+        if img_data:
+            # a2b_base64 reads the ASCII str in place; b64decode would first
+            # copy it into a bytes object
+            return _save_image(target_path, binascii.a2b_base64(img_data), writer)
 
     if "error" in result:
         print(f"  API Error: {result['error'].get('message')}")
     return False
 
 
+def generate_imagen(session, batch, api_key, model, writer=None, limiter=None):
+    """
+    Generate one image per (prompt, target_path) in `batch` with a single
+    Imagen :predict request, one instance per prompt.
+
+    Returns a list aligned with `batch` holding, per image, what
+    generate_gemini returns. Filtered images keep their slot in the
+    response (includeRaiReason), so predictions pair up with prompts by
+    position; if the counts still disagree the whole batch fails rather
+    than risk saving an image under the wrong name.
+    """
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:predict"
+    headers = {
+        "Content-Type": "application/json",
+        "X-goog-api-key": api_key,
+    }
+    payload = {
+        "instances": [{"prompt": prompt} for prompt, _ in batch],
+        "parameters": IMAGEN_PARAMETERS,
+    }
+
+    failed = [False] * len(batch)
+    response = call_api(session, url, headers, payload, limiter=limiter)
+    if response is None or response.status_code != 200:
+        _print_http_error(response)
+        return failed
+
+    result = loads_json(response.content)
+    predictions = result.get("predictions") or ()
+    if len(predictions) != len(batch):
+        if "error" in result:
+            print(f"  API Error: {result['error'].get('message')}")
+        elif len(batch) > 1:
+            print(f"  Error: {len(predictions)} predictions for {len(batch)} prompts")
+        return failed
+
+    saved = []
+    for (_, target_path), prediction in zip(batch, predictions):
+        img_data = prediction.get("bytesBase64Encoded")
+        if img_data:
+            saved.append(_save_image(target_path, binascii.a2b_base64(img_data), writer))
+        else:
+            reason = prediction.get("raiFilteredReason")
+            if reason:
+                print(f"  Filtered: {reason}")
+            saved.append(False)
+    return saved
+
+
+# Most decoded images waiting for (or in) the writer pool at once
+WRITE_QUEUE_SIZE = 32
+
+
+class WriteQueue:
+    """
+    Writer pool front that holds at most `size` images queued or being
+    written. submit() blocks the calling API thread when it is full, so
+    when the disk is slower than the network, decoded images wait in the
+    response instead of piling up in memory.
+    """
+
+    def __init__(self, executor, size):
+        self.executor = executor
+        self.slots = threading.BoundedSemaphore(size)
+
+    def submit(self, fn, *args):
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+def generate_google_concurrent(jobs, reference_image, api_key, model, concurrency, max_rps=None, cache=None,
+                               batch_size=1):
+    """
+    Run Google API generations with up to `concurrency` requests in flight
+    and, if `max_rps` is set, at most that many requests per second.
+
+    `jobs` is a list of (sprite_path, prompt, target_path) tuples and
+    `reference_image` the raw reference PNG (bytes or mmap, or None). The work is
+    network-bound, so a thread pool overlaps the round-trips over one shared
+    connection pool, and PNG writes drain on a separate writer pool (through
+    a bounded WriteQueue) so they never hold up the next request. Results
+    are reported as each completes.
+    Each distinct prompt is generated once and linked to every job sharing
+    it. Prompts found in the PromptCache `cache` are linked without a
+    request, and new images are added to it. Imagen models get `batch_size`
+    prompts per request.
+    """
+    # One request per distinct prompt: later jobs with the same prompt get a
+    # link to the first one's image
+    first = {}
+    duplicates = {}
+    for job in jobs:
+        prompt = job[1]
+        if prompt in first:
+            duplicates.setdefault(prompt, []).append(job)
+        else:
+            first[prompt] = job
+
+    def copy_to_duplicates(prompt, target_path):
+        for sprite_path, _, other_path in duplicates.get(prompt, ()):
+            try:
+                link_or_copy(target_path, other_path)
+                print(f"  Saved to {other_path} (same prompt as {target_path})")
+            except OSError as e:
+                print(f"  Error generating {sprite_path}: {e}")
+
+    def fail_duplicates(prompt, sprite_path):
+        # The one request for this prompt failed, so its duplicates have no image either
+        for other_sprite, _, _ in duplicates.get(prompt, ()):
+            print(f"  Error generating {other_sprite}: same prompt as {sprite_path}, which failed")
+
+    jobs = []
+    for prompt, job in first.items():
+        sprite_path, _, target_path = job
+        if cache is not None and cache.fetch(prompt, target_path):
+            print(f"  Reused cached image for {sprite_path}")
+            copy_to_duplicates(prompt, target_path)
+        else:
+            jobs.append(job)
+    if not jobs:
+        return
+
+    with make_session(concurrency) as session, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool, \
+            ThreadPoolExecutor(max_workers=2) as write_pool:
+        writer = WriteQueue(write_pool, WRITE_QUEUE_SIZE)
+        reference = reference_part(session, reference_image, api_key, model)
+        limiter = TokenBucket(max_rps, burst=concurrency) if max_rps else None
+        # Imagen takes several prompts per request; Gemini one per request
+        imagen = is_imagen(model)
+        size = max(1, batch_size) if imagen else 1
+
+        def run(batch):
+            if imagen:
+                return generate_imagen(
+                    session, [(prompt, target_path) for _, prompt, target_path in batch],
+                    api_key, model, writer, limiter,
+                )
+            _, prompt, target_path = batch[0]
+            return [generate_gemini(session, prompt, target_path, reference, api_key, model, writer, limiter)]
+
+        futures = {
+            pool.submit(run, batch): batch
+            for batch in (jobs[i:i + size] for i in range(0, len(jobs), size))
+        }
+        writes = []
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:  # noqa: BLE001 - one failed request must not stop the run
+                for sprite_path, prompt, _ in batch:
+                    print(f"  Error generating {sprite_path}: {e}")
+                    fail_duplicates(prompt, sprite_path)
+                continue
+            for (sprite_path, prompt, target_path), write in zip(batch, results):
+                if not write:
+                    print(f"  Warning: No image data returned for {sprite_path}")
+                    fail_duplicates(prompt, sprite_path)
+                    continue
+                writes.append((write, sprite_path, target_path, prompt))
+        for write, sprite_path, target_path, prompt in writes:
+            if _report_save(write, sprite_path, target_path):
+                if cache is not None:
+                    cache.store(prompt, target_path)
+                copy_to_duplicates(prompt, target_path)
+            else:
+                fail_duplicates(prompt, sprite_path)
+
+
 # ============================================================================
 # Mapping loader: collect entries from all sections
 # ============================================================================
 
-def load_entries(mapping_data, categories):
+def iter_entries(mapping_data, categories):
     """
-    Collect entries from the mapping.json, supporting both the new sectioned
+    Yield entries from the mapping.json, supporting both the new sectioned
     format and the legacy flat format.
 
-    Each returned entry is a tuple of (category, entry_dict).
+    Each yielded entry is a tuple of (category, entry_dict).
     """
-    entries = []
+    found = False
 
     # New sectioned format: {"items": [...], "monsters": [...], ...}
     for category in categories:
-        section = mapping_data.get(category, [])
-        for entry in section:
-            entries.append((category, entry))
+        for entry in mapping_data.get(category, []):
+            found = True
+            yield category, entry
 
     # Legacy flat format: {"mappings": [...]}
-    if not entries:
+    if not found:
         for entry in mapping_data.get("mappings", []):
-            entries.append(("items", entry))
+            yield "items", entry
 
-    return entries
+
+def existing_sprites(output_dir):
+    """
+    Return the set of files under output_dir as '/'-separated relative paths.
+
+    One recursive os.scandir walk replaces a stat() per mapping entry when
+    filtering out sprites that were already generated.
+    """
+    found = set()
+    stack = [(output_dir, "")]
+    while stack:
+        dir_path, prefix = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                for dirent in it:
+                    rel = prefix + dirent.name
+                    if dirent.is_dir():
+                        if rel != PROMPT_CACHE_DIR:
+                            stack.append((dirent.path, rel + "/"))
+                    else:
+                        found.add(rel)
+        except OSError:
+            continue
+    return found
 
 
 # ============================================================================
@@ -326,7 +1018,7 @@ def main():
     parser.add_argument("--seed", type=int, default=42, help="Base seed for local generation (default: 42)")
     parser.add_argument(
         "--category",
-        choices=["items", "monsters", "dungeon", "traps", "artifacts", "player", "all"],
+        choices=[*CATEGORIES, "all"],
         default="all",
         help="Which category to generate (default: all)",
     )
@@ -335,17 +1027,39 @@ def main():
         help="Generation backend: 'local' uses mflux Flux1Schnell, 'google' uses Gemini/Imagen API (default: local)",
     )
 
+    # Local-specific options
+    local_group = parser.add_argument_group("local backend options")
+    local_group.add_argument(
+        "--workers", type=int, default=1,
+        help="Model worker processes, each loading its own Flux model (default: 1)",
+    )
+
     # Google-specific options
     google_group = parser.add_argument_group("google backend options")
     google_group.add_argument("--api-key", help="Google API Key (or set GOOGLE_API_KEY env var)")
     google_group.add_argument("--reference-image", help="Path to a reference image to maintain style")
     google_group.add_argument("--model", default="imagen-3.0-generate-001", help="Model name (default: imagen-3.0-generate-001)")
+    google_group.add_argument(
+        "--concurrency", type=int, default=4,
+        help="Maximum number of API requests in flight (default: 4)",
+    )
+    google_group.add_argument(
+        "--batch-size", type=int, default=1,
+        help="Prompts per Imagen request, as separate instances (default: 1; Gemini always sends 1)",
+    )
+    google_group.add_argument(
+        "--no-prompt-cache", action="store_true",
+        help=f"Always call the API, even for a prompt already generated into {PROMPT_CACHE_DIR}/",
+    )
+    google_group.add_argument(
+        "--max-rps", type=float, default=None,
+        help="Maximum API requests per second, kept under quota to avoid 429s (default: unlimited)",
+    )
 
     args = parser.parse_args()
 
     # Backend-specific validation
-    reference_b64 = None
-    flux_model = None
+    reference_path = None
     api_key = None
 
     if args.backend == "google":
@@ -358,70 +1072,63 @@ def main():
             if not os.path.exists(args.reference_image):
                 print(f"Error: Reference image {args.reference_image} not found.")
                 return
-            with open(args.reference_image, "rb") as f:
-                reference_b64 = base64.b64encode(f.read()).decode("utf-8")
-    else:
-        if not args.dry_run:
-            from mflux.models.flux.variants.txt2img.flux import Flux1  # type: ignore[import-not-found]
-
-            print("Loading Flux1Schnell model (quantize=8)...")
-            flux_model = Flux1(quantize=8)
+            if os.path.getsize(args.reference_image) == 0:
+                print(f"Error: Reference image {args.reference_image} is empty.")
+                return
+            reference_path = args.reference_image
 
     if not os.path.exists(args.mapping):
         print(f"Error: Mapping file {args.mapping} not found.")
         return
 
-    with open(args.mapping, 'r') as f:
-        mapping_data = json.load(f)
+    # One read plus orjson when available; the sections are walked in
+    # category order, so the whole document is needed up front anyway
+    with open(args.mapping, 'rb') as f:
+        mapping_data = loads_json(f.read())
 
     os.makedirs(args.output, exist_ok=True)
 
     # Determine which categories to generate
-    all_categories = ["items", "monsters", "dungeon", "traps", "artifacts", "player"]
     if args.category == "all":
-        categories = all_categories
+        categories = CATEGORIES
     else:
         categories = [args.category]
 
-    entries = load_entries(mapping_data, categories)
-
-    # Filter out existing sprites unless --force
+    # Resolve each entry's sprite path once, dropping entries without one,
+    # then filter out existing sprites unless --force and apply --limit, in
+    # one pass
+    entries = (
+        (category, entry, sprite_path) for category, entry in iter_entries(mapping_data, categories)
+        if (sprite_path := entry.get("icon", {}).get("bevy_sprite"))
+    )
     if not args.force:
-        remaining = []
-        for category, entry in entries:
-            sprite_path = entry.get("icon", {}).get("bevy_sprite")
-            if sprite_path:
-                target_path = os.path.join(args.output, sprite_path)
-                if not os.path.exists(target_path):
-                    remaining.append((category, entry))
-        entries = remaining
-
+        existing = existing_sprites(args.output)
+        entries = (job for job in entries if job[2] not in existing)
     if args.limit:
-        entries = entries[:args.limit]
+        entries = itertools.islice(entries, args.limit)
+    entries = list(entries)
 
     # Print category breakdown
-    category_counts: dict[str, int] = {}
-    for category, _ in entries:
-        category_counts[category] = category_counts.get(category, 0) + 1
+    category_counts = Counter(category for category, _, _ in entries)
     print(f"Generating {len(entries)} sprites (backend: {args.backend}):")
     for cat, count in sorted(category_counts.items()):
         print(f"  {cat}: {count}")
     print()
 
-    for idx, (category, entry) in enumerate(entries):
-        icon_def = entry.get("icon", {})
-        sprite_path = icon_def.get("bevy_sprite")
+    # Create each output subdirectory once (there are only a handful)
+    sprite_dirs = {os.path.dirname(os.path.join(args.output, sprite_path)) for _, _, sprite_path in entries}
+    for sprite_dir in sprite_dirs:
+        os.makedirs(sprite_dir, exist_ok=True)
 
-        if not sprite_path:
-            continue
+    # Generation jobs are queued here and dispatched after the loop
+    google_jobs = []
+    local_jobs = []
 
+    for idx, (category, entry, sprite_path) in enumerate(entries):
         target_path = os.path.join(args.output, sprite_path)
 
-        # Create subdirectories as needed
-        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-
         # Generate prompt using category-specific generator
-        prompt_fn = PROMPT_GENERATORS.get(category, generate_item_prompt)
+        prompt_fn = PROMPT_FNS[CATEGORY_INDEX[category]]
         prompt = prompt_fn(entry, args.resolution)
 
         name = entry.get("name", sprite_path)
@@ -432,17 +1139,28 @@ def main():
         if args.dry_run:
             continue
 
-        try:
-            if args.backend == "local":
-                generate_local(prompt, target_path, args.resolution, args.seed + idx, flux_model)
-            else:
-                if not generate_google(prompt, target_path, reference_b64, api_key, args.model):
-                    print(f"  Warning: No image data returned for {sprite_path}")
-                    continue
+        if args.backend == "google":
+            google_jobs.append((sprite_path, prompt, target_path))
+            continue
 
-            print(f"  Saved to {target_path}")
-        except Exception as e:
-            print(f"  Error generating {sprite_path}: {e}")
+        local_jobs.append((sprite_path, prompt, target_path, args.seed + idx))
+
+    if local_jobs:
+        print(f"\nGenerating {len(local_jobs)} images locally (workers: {args.workers})...")
+        generate_local_batch(local_jobs, args.resolution, max(1, args.workers))
+
+    if google_jobs:
+        print(f"\nDispatching {len(google_jobs)} API requests (concurrency: {args.concurrency})...")
+        with map_reference(reference_path) as reference_image:
+            cache = None
+            if not args.no_prompt_cache:
+                cache = PromptCache(
+                    os.path.join(args.output, PROMPT_CACHE_DIR), args.model, reference_image, refresh=args.force,
+                )
+            generate_google_concurrent(
+                google_jobs, reference_image, api_key, args.model, max(1, args.concurrency),
+                args.max_rps, cache, args.batch_size,
+            )
 
 if __name__ == "__main__":
     main()
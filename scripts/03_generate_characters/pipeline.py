@@ -6,41 +6,56 @@ Usage:
     python pipeline.py --input input/ --output output/
     python pipeline.py --input input/hero.png --output output/ --format glb
     python pipeline.py --input input/ --output output/ --skip-rig  # mesh only
-    python pipeline.py --input input/ --output output/ --workers 8
+    python pipeline.py --input input/ --output output/ --workers 8  # 8 parallel Blender rigs
     python pipeline.py --all --output output/ --rig-dirs monsters,player  # batch all nh-bevy assets
 
 Pipeline stages:
-    1. TripoSR: single image → 3D textured mesh (OBJ)
+    1. TripoSR: single image → 3D textured mesh (OBJ), via persistent model workers
     2. (optional) Decimate mesh to target face count via fast_simplification
     3. Blender headless: auto-rig with humanoid armature → FBX/GLB
+       (in-process via the bpy module when it is installed)
 
 Requirements:
     - Python venv with TripoSR dependencies (see setup.sh)
-    - Blender installed (for rigging stage; mesh generation works without it)
+    - Blender installed, or `pip install bpy` (for rigging stage; mesh generation works without it)
 """
 
 import argparse
+import importlib.util
 import json
+import multiprocessing
 import os
+import queue
 import shutil
 import subprocess
 import sys
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from functools import cache, lru_cache
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib json module
+    orjson = None
+
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent.parent
 TRIPOSR_DIR = PROJECT_ROOT / "tmp" / "TripoSR"
 BLENDER_RIG_SCRIPT = SCRIPT_DIR / "scripts" / "blender_rig.py"
+TRIPOSR_WORKER_SCRIPT = SCRIPT_DIR / "scripts" / "triposr_worker.py"
 
 NH_BEVY_ASSETS = Path("/assets/items")
 
 IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
 
+# Stands in for a Blender executable path when rigging runs through bpy
+IN_PROCESS_BLENDER = "bpy"
+
 
+@lru_cache(maxsize=1)
 def detect_device() -> str:
     """Pick the best available compute device."""
     try:
@@ -65,6 +80,126 @@ class CharacterResult:
     error: str = ""
 
 
+def manifest_entry(r: CharacterResult) -> dict:
+    """The manifest record for one character."""
+    return {
+        "name": r.name,
+        "image": r.image_path,
+        "mesh": r.mesh_path,
+        "rigged": r.rigged_path,
+        "mesh_time": r.mesh_time,
+        "rig_time": r.rig_time,
+        "error": r.error,
+    }
+
+
+def dump_json(obj, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes with orjson if available (2-space indent if asked)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+
+@cache
+def triposr_model_path() -> str:
+    """Use local weights if downloaded, otherwise TripoSR downloads from HF.
+
+    Checked once per run; the answer cannot change between images.
+    """
+    weights_dir = SCRIPT_DIR / "weights"
+    return str(weights_dir) if (weights_dir / "model.ckpt").exists() else "stabilityai/TripoSR"
+
+
+class TripoSRWorker:
+    """A persistent TripoSR process that keeps the model loaded between images.
+
+    Requests and replies are JSON lines over the worker's stdin/stdout (see
+    scripts/triposr_worker.py). The process is started on the first request,
+    so runs where every mesh already exists never load the model.
+    Not thread-safe: use one worker per thread.
+    """
+
+    def __init__(self, device: str):
+        self.device = device
+        self.proc: subprocess.Popen[str] | None = None
+
+    def _start(self) -> subprocess.Popen[str]:
+        # Respawn after a crash so one bad image only fails itself
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                [
+                    sys.executable,
+                    str(TRIPOSR_WORKER_SCRIPT),
+                    "--device", self.device,
+                    "--pretrained-model-name-or-path", triposr_model_path(),
+                    "--triposr-dir", str(TRIPOSR_DIR),
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                cwd=str(TRIPOSR_DIR),
+            )
+        return self.proc
+
+    def run(
+        self,
+        image_path: Path,
+        output_dir: Path,
+        mc_resolution: int,
+        bake_texture: bool,
+        max_faces: int | None = None,
+    ) -> tuple[int, int] | None:
+        """Mesh one image into output_dir/0/, raising RuntimeError on failure.
+
+        With max_faces the worker decimates the mesh in memory before writing
+        it, when it can; returns (original_faces, new_faces) if it did.
+        """
+        proc = self._start()
+        assert proc.stdin is not None and proc.stdout is not None
+        request = {
+            "image": str(image_path),
+            "output_dir": str(output_dir),
+            "mc_resolution": mc_resolution,
+            "bake_texture": bake_texture,
+            "max_faces": max_faces,
+        }
+        try:
+            proc.stdin.write(json.dumps(request) + "\n")
+            proc.stdin.flush()
+        except BrokenPipeError:
+            pass
+        line = proc.stdout.readline()
+        if not line:
+            self._discard()
+            raise RuntimeError(f"TripoSR worker exited (exit code {proc.returncode})")
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            # Out of sync with the worker: start a fresh one next time
+            self._discard()
+            raise RuntimeError(f"TripoSR worker sent a bad reply: {line.strip()[:200]}")
+        if not reply.get("ok"):
+            raise RuntimeError(f"TripoSR failed for {image_path.stem}: {reply.get('error')}")
+        faces = reply.get("faces")
+        return tuple(faces) if faces else None
+
+    def _discard(self) -> None:
+        """Kill (if still running) and forget the current process."""
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    def close(self) -> None:
+        """Ask the worker to exit (EOF on stdin) and wait for it."""
+        if self.proc is not None and self.proc.poll() is None:
+            assert self.proc.stdin is not None
+            self.proc.stdin.close()
+            self.proc.wait()
+
+
+@lru_cache(maxsize=1)
 def find_blender() -> str | None:
     """Locate the Blender executable."""
     # Check PATH
@@ -80,15 +215,40 @@ def find_blender() -> str | None:
     return None
 
 
+@lru_cache(maxsize=1)
+def has_bpy() -> bool:
+    """Whether Blender is importable as a Python module (pip install bpy)."""
+    return importlib.util.find_spec("bpy") is not None
+
+
+@lru_cache(maxsize=1)
+def load_blender_rig():
+    """Import scripts/blender_rig.py as a module (once per process)."""
+    spec = importlib.util.spec_from_file_location("blender_rig", BLENDER_RIG_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
 def find_images(input_path: Path) -> list[Path]:
-    """Find all image files in the input path."""
+    """Find all image files in the input path.
+
+    Walks the tree with os.scandir and checks the extension first, so
+    non-image files (meshes, audio, JSON) cost no stat call.
+    """
     if input_path.is_file():
         return [input_path]
 
     images = []
-    for f in sorted(input_path.rglob("*")):
-        if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS:
-            images.append(f)
+    pending = [str(input_path)]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    images.append(Path(entry.path))
+    images.sort()
     return images
 
 
@@ -105,38 +265,53 @@ def relative_output_dir(image_path: Path, input_root: Path, output_dir: Path) ->
     return output_dir / rel.parent / rel.stem
 
 
-def generate_mesh(image_path: Path, char_output: Path, mc_resolution: int, bake_texture: bool, device: str = "cpu") -> Path:
+def generate_mesh(
+    image_path: Path,
+    char_output: Path,
+    mc_resolution: int,
+    bake_texture: bool,
+    device: str = "cpu",
+    worker: TripoSRWorker | None = None,
+    max_faces: int | None = None,
+) -> tuple[Path, tuple[int, int] | None]:
     """
     Run TripoSR to generate a 3D mesh from a single image.
-    Returns the path to the generated OBJ file.
+    Returns the path to the generated OBJ file and, if the mesh was already
+    decimated to max_faces, its (original_faces, new_faces).
+
+    With a worker, the image is sent to its already-loaded model, which
+    decimates in memory so the OBJ is not written, re-read and re-written;
+    otherwise TripoSR's run.py is started for this image alone.
     """
     name = image_path.stem
+    faces = None
 
-    # Use local weights if downloaded, otherwise TripoSR downloads from HF
-    weights_dir = SCRIPT_DIR / "weights"
-    model_path = str(weights_dir) if (weights_dir / "model.ckpt").exists() else "stabilityai/TripoSR"
-
-    cmd = [
-        sys.executable,
-        str(TRIPOSR_DIR / "run.py"),
-        str(image_path),
-        "--output-dir", str(char_output),
-        "--mc-resolution", str(mc_resolution),
-        "--device", device,
-        "--pretrained-model-name-or-path", model_path,
-    ]
-    if bake_texture:
-        cmd.append("--bake-texture")
-
-    print(f"  [{name}] Generating mesh (resolution={mc_resolution}, device={device})...")
-    print(f"  [{name}] Running: {' '.join(cmd)}")
-    result = subprocess.run(
-        cmd,
-        cwd=str(TRIPOSR_DIR),
-    )
+    if worker is not None:
+        print(f"  [{name}] Generating mesh (resolution={mc_resolution}, device={worker.device})...")
+        faces = worker.run(image_path, char_output, mc_resolution, bake_texture, max_faces)
+    else:
+        cmd = [
+            sys.executable,
+            str(TRIPOSR_DIR / "run.py"),
+            str(image_path),
+            "--output-dir", str(char_output),
+            "--mc-resolution", str(mc_resolution),
+            "--device", device,
+            "--pretrained-model-name-or-path", triposr_model_path(),
+        ]
+        if bake_texture:
+            cmd.append("--bake-texture")
+
+        print(f"  [{name}] Generating mesh (resolution={mc_resolution}, device={device})...")
+        print(f"  [{name}] Running: {' '.join(cmd)}")
+        result = subprocess.run(
+            cmd,
+            cwd=str(TRIPOSR_DIR),
+            check=False,
+        )
 
-    if result.returncode != 0:
-        raise RuntimeError(f"TripoSR failed for {name} (exit code {result.returncode})")
+        if result.returncode != 0:
+            raise RuntimeError(f"TripoSR failed for {name} (exit code {result.returncode})")
 
     # TripoSR outputs to <output_dir>/0/mesh.obj (single image → index 0)
     mesh_path = char_output / "0" / "mesh.obj"
@@ -149,7 +324,7 @@ def generate_mesh(image_path: Path, char_output: Path, mc_resolution: int, bake_
             f"Contents: {list((char_output / '0').iterdir()) if (char_output / '0').exists() else 'dir missing'}"
         )
 
-    return mesh_path
+    return mesh_path, faces
 
 
 def decimate_mesh(mesh_path: Path, max_faces: int) -> tuple[Path, int, int]:
@@ -180,7 +355,17 @@ def rig_mesh(mesh_path: Path, output_path: Path, blender_bin: str) -> Path:
     """
     Use Blender headless to auto-rig the mesh.
     Returns the path to the rigged file.
+
+    With blender_bin == IN_PROCESS_BLENDER the rig script runs in this
+    process through bpy instead of starting a Blender per mesh. bpy keeps
+    one global scene, so callers must not rig from two threads at once.
     """
+    if blender_bin == IN_PROCESS_BLENDER:
+        load_blender_rig().rig(str(mesh_path), str(output_path))
+        if not output_path.exists():
+            raise FileNotFoundError(f"Rigged file not created: {output_path}")
+        return output_path
+
     cmd = [
         blender_bin,
         "--background",
@@ -222,7 +407,7 @@ def mesh_exists(char_output: Path) -> Path | None:
     return None
 
 
-def process_single(
+def mesh_stage(
     image_path: Path,
     input_root: Path,
     output_dir: Path,
@@ -234,8 +419,13 @@ def process_single(
     device: str = "cpu",
     rig_dirs: list[str] | None = None,
     max_faces: int | None = None,
-) -> CharacterResult:
-    """Process a single character image through the full pipeline."""
+    worker: TripoSRWorker | None = None,
+) -> tuple[CharacterResult, tuple[Path, Path] | None]:
+    """Generate (and optionally decimate) the mesh for one image.
+
+    Returns the result so far and, if the mesh should be rigged, the
+    (mesh_path, rigged_path) pair to pass to rig_stage().
+    """
     name = image_path.stem
     char_output = relative_output_dir(image_path, input_root, output_dir)
     result = CharacterResult(name=name, image_path=str(image_path))
@@ -245,24 +435,29 @@ def process_single(
     if existing is not None:
         result.mesh_path = str(existing)
         print(f"  [{name}] Skipping (mesh already exists)")
-        return result
+        return result, None
 
     # Stage 1: Generate mesh
     try:
         t0 = time.monotonic()
-        mesh_path = generate_mesh(image_path, char_output, mc_resolution, bake_texture, device)
+        mesh_path, faces = generate_mesh(
+            image_path, char_output, mc_resolution, bake_texture, device, worker, max_faces,
+        )
         result.mesh_time = time.monotonic() - t0
         result.mesh_path = str(mesh_path)
         print(f"  [{name}] Mesh generated in {result.mesh_time:.1f}s → {mesh_path}")
     except Exception as e:
         result.error = f"mesh generation: {e}"
         print(f"  [{name}] FAILED mesh: {e}")
-        return result
+        return result, None
 
     # Stage 1.5: Decimate
     if max_faces is not None:
         try:
-            _, orig, final = decimate_mesh(mesh_path, max_faces)
+            if faces is not None:
+                orig, final = faces
+            else:
+                _, orig, final = decimate_mesh(mesh_path, max_faces)
             if orig != final:
                 print(f"  [{name}] Decimated {orig} → {final} faces")
             else:
@@ -270,7 +465,7 @@ def process_single(
         except Exception as e:
             result.error = f"decimation: {e}"
             print(f"  [{name}] FAILED decimate: {e}")
-            return result
+            return result, None
 
     # Stage 2: Auto-rig (skip if globally disabled, or if this image isn't in a rig dir)
     do_rig = not skip_rig and should_rig(image_path, rig_dirs)
@@ -279,10 +474,15 @@ def process_single(
             print(f"  [{name}] Skipping rig (not in rig-dirs)")
         elif not skip_rig:
             print(f"  [{name}] Skipping rig (Blender not found)")
-        return result
+        return result, None
+
+    return result, (mesh_path, char_output / f"{name}_rigged.{export_format}")
+
 
+def rig_stage(result: CharacterResult, mesh_path: Path, rigged_path: Path, blender_bin: str) -> CharacterResult:
+    """Rig a generated mesh with Blender, recording the outcome in result."""
+    name = result.name
     try:
-        rigged_path = char_output / f"{name}_rigged.{export_format}"
         t0 = time.monotonic()
         rig_mesh(mesh_path, rigged_path, blender_bin)
         result.rig_time = time.monotonic() - t0
@@ -295,6 +495,30 @@ def process_single(
     return result
 
 
+def process_single(
+    image_path: Path,
+    input_root: Path,
+    output_dir: Path,
+    blender_bin: str | None,
+    export_format: str,
+    mc_resolution: int,
+    bake_texture: bool,
+    skip_rig: bool,
+    device: str = "cpu",
+    rig_dirs: list[str] | None = None,
+    max_faces: int | None = None,
+    worker: TripoSRWorker | None = None,
+) -> CharacterResult:
+    """Process a single character image through the full pipeline."""
+    result, rig_job = mesh_stage(
+        image_path, input_root, output_dir, blender_bin, export_format,
+        mc_resolution, bake_texture, skip_rig, device, rig_dirs, max_faces, worker,
+    )
+    if rig_job is None or blender_bin is None:
+        return result
+    return rig_stage(result, *rig_job, blender_bin)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="img2char: Batch 2D image → game-ready 3D character",
@@ -313,7 +537,9 @@ def main():
     parser.add_argument("--rig-dirs", type=str, default=None,
                         help="Comma-separated directory patterns to rig (e.g. 'monsters,player'). "
                              "Images outside these dirs get mesh only. Omit to rig everything.")
-    parser.add_argument("--workers", "-w", type=int, default=1, help="Parallel workers for mesh generation (default: 1)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Parallel Blender rigging jobs (default: 1)")
+    parser.add_argument("--mesh-workers", type=int, default=1,
+                        help="Persistent TripoSR processes; more than 1 only helps with several GPUs (default: 1)")
     parser.add_argument("--blender", type=str, default=None, help="Path to Blender executable (auto-detected if not set)")
     parser.add_argument("--device", type=str, default=None, help="Compute device: cpu, mps, cuda:0 (auto-detected if not set)")
     args = parser.parse_args()
@@ -350,8 +576,8 @@ def main():
     # For relative path computation: use parent dir when input is a single file
     input_root = input_path.parent if input_path.is_file() else input_path
 
-    # Find Blender
-    blender_bin = args.blender or find_blender()
+    # Find Blender: an explicit --blender wins, then the bpy module, then PATH
+    blender_bin = args.blender or (IN_PROCESS_BLENDER if has_bpy() else find_blender())
     if not args.skip_rig and blender_bin is None:
         print("WARNING: Blender not found. Will generate meshes only.")
         print("Install Blender or pass --blender /path/to/blender")
@@ -366,36 +592,78 @@ def main():
     print(f"  Resolution: {args.resolution}")
     print(f"  Max faces:  {args.max_faces or 'unlimited'}")
     print(f"  Device:     {device}")
-    print(f"  Blender:    {blender_bin or 'not found'}")
+    print(f"  Blender:    {'bpy (in-process)' if blender_bin == IN_PROCESS_BLENDER else blender_bin or 'not found'}")
     print(f"  Rig dirs:   {rig_dirs or 'all (no filter)'}")
-    print(f"  Workers:    {args.workers}")
+    print(f"  Workers:    {args.mesh_workers} mesh, {args.workers} rig")
     print()
 
     t_start = time.monotonic()
     results: list[CharacterResult] = []
 
-    if args.workers > 1:
-        # Parallel mesh generation, then sequential rigging (Blender is heavy)
-        with ProcessPoolExecutor(max_workers=args.workers) as pool:
-            futures = {
-                pool.submit(
-                    process_single,
-                    img, input_root, output_dir, blender_bin, args.format,
-                    args.resolution, args.bake_texture, args.skip_rig, device, rig_dirs,
-                    args.max_faces,
-                ): img
-                for img in images
-            }
-            for future in as_completed(futures):
-                results.append(future.result())
-    else:
-        for img in images:
-            r = process_single(
+    # One line per finished character, written as each completes, so a
+    # crashed run still records what it finished. Rewritten every run, so it
+    # only ever describes the current one.
+    log_path = output_dir / "manifest.jsonl"
+
+    # Stage 1 (mesh): persistent TripoSR processes, so the model is loaded
+    # once per worker rather than once per image. Each job borrows an idle
+    # worker from the queue; the threads only coordinate.
+    n_mesh = max(1, min(args.mesh_workers, len(images)))
+    mesh_workers = [TripoSRWorker(device) for _ in range(n_mesh)]
+    idle: queue.Queue[TripoSRWorker] = queue.Queue()
+    for w in mesh_workers:
+        idle.put(w)
+
+    def mesh_one(img: Path) -> tuple[CharacterResult, tuple[Path, Path] | None]:
+        worker = idle.get()
+        try:
+            return mesh_stage(
                 img, input_root, output_dir, blender_bin, args.format,
                 args.resolution, args.bake_texture, args.skip_rig, device, rig_dirs,
-                args.max_faces,
+                args.max_faces, worker,
             )
-            results.append(r)
+        finally:
+            idle.put(worker)
+
+    # Stage 2 (rig): each finished mesh goes straight to the Blender pool, so
+    # rigging one character overlaps meshing the next. In-process bpy has a
+    # single scene per interpreter, so it gets worker processes (each imports
+    # bpy once) where a Blender subprocess per job only needs threads. The
+    # processes are spawned, not forked: they start while mesh threads run.
+    if blender_bin == IN_PROCESS_BLENDER:
+        rig_pool = ProcessPoolExecutor(max_workers=max(1, args.workers),
+                                       mp_context=multiprocessing.get_context("spawn"))
+    else:
+        rig_pool = ThreadPoolExecutor(max_workers=max(1, args.workers))
+    try:
+        with rig_pool, ThreadPoolExecutor(max_workers=n_mesh) as mesh_pool, open(log_path, "wb") as log:
+            # All appends happen on this thread
+            def record(result: CharacterResult) -> None:
+                results.append(result)
+                log.write(dump_json(manifest_entry(result)) + b"\n")
+                log.flush()
+
+            # Mesh and rig futures are drained together, so each character
+            # is logged as soon as its last stage finishes
+            pending = {mesh_pool.submit(mesh_one, img) for img in images}
+            rig_futures = set()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in rig_futures:
+                        rig_futures.discard(future)
+                        record(future.result())
+                        continue
+                    result, rig_job = future.result()
+                    if rig_job is None or blender_bin is None:
+                        record(result)
+                    else:
+                        rig_future = rig_pool.submit(rig_stage, result, *rig_job, blender_bin)
+                        rig_futures.add(rig_future)
+                        pending.add(rig_future)
+    finally:
+        for w in mesh_workers:
+            w.close()
 
     total_time = time.monotonic() - t_start
 
@@ -415,23 +683,12 @@ def main():
     # Write manifest
     manifest = {
         "total_time": total_time,
-        "characters": [
-            {
-                "name": r.name,
-                "image": r.image_path,
-                "mesh": r.mesh_path,
-                "rigged": r.rigged_path,
-                "mesh_time": r.mesh_time,
-                "rig_time": r.rig_time,
-                "error": r.error,
-            }
-            for r in results
-        ],
+        "characters": [manifest_entry(r) for r in results],
     }
     manifest_path = output_dir / "manifest.json"
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
-    print(f"\n  Manifest: {manifest_path}")
+    with open(manifest_path, "wb") as f:
+        f.write(dump_json(manifest, indent=True))
+    print(f"\n  Manifest: {manifest_path}  (log: {log_path})")
 
 
 if __name__ == "__main__":
@@ -3,15 +3,37 @@ Blender headless script for auto-rigging a humanoid mesh.
 
 Called via:
     blender --background --python blender_rig.py -- input.obj output.fbx
+    blender --background --python blender_rig.py -- --batch jobs.jsonl
+
+or, when bpy is installed as a Python module, imported by pipeline.py
+and run in-process through rig().
+
+In --batch mode each line of the JSONL file is {"input": ..., "output": ...};
+one Blender start is shared by all the jobs, with the scene cleared
+between them.
 
 This places a basic humanoid armature scaled to the mesh bounding box,
-then uses Blender's "automatic weights" to skin it.
+then skins it with bone heat weights (Baran & Popovic, "Automatic Rigging
+and Animation of 3D Characters"), solved directly with scipy when it is
+available and through Blender's "automatic weights" operator otherwise.
+Blender bundles its own Python without scipy; to install it there:
+    blender --background --python-expr \
+        "import subprocess, sys; subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'scipy'])"
 """
 
 import bpy
+import json
+import numpy as np
 import sys
 import os
 from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+# Weights below this are not written to the vertex groups
+MIN_WEIGHT = 0.01
+
+# Closest bones per vertex checked for visibility in heat_weights()
+VISIBILITY_CANDIDATES = 3
 
 
 def clear_scene():
@@ -19,6 +41,12 @@ def clear_scene():
     bpy.ops.object.delete(use_global=False)
     for collection in bpy.data.collections:
         bpy.data.collections.remove(collection)
+    # Drop the data the deleted objects left behind, so a long batch does
+    # not accumulate meshes and armatures
+    for blocks in (bpy.data.meshes, bpy.data.armatures, bpy.data.materials):
+        for block in list(blocks):
+            if block.users == 0:
+                blocks.remove(block)
 
 
 def import_mesh(filepath):
@@ -49,14 +77,12 @@ def import_mesh(filepath):
 
 def get_mesh_bounds(obj):
     """Get world-space bounding box of mesh."""
-    bbox = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
-    xs = [v.x for v in bbox]
-    ys = [v.y for v in bbox]
-    zs = [v.z for v in bbox]
-    return (
-        Vector((min(xs), min(ys), min(zs))),
-        Vector((max(xs), max(ys), max(zs))),
-    )
+    # All 8 corners in one matmul (float32, like mathutils) instead of a
+    # Vector per corner
+    corners = np.asarray(obj.bound_box, dtype=np.float32)
+    m = np.asarray(obj.matrix_world, dtype=np.float32)
+    world = corners @ m[:3, :3].T + m[:3, 3]
+    return Vector(world.min(axis=0)), Vector(world.max(axis=0))
 
 
 def create_humanoid_armature(mesh_obj):
@@ -94,52 +120,208 @@ def create_humanoid_armature(mesh_obj):
     bpy.ops.armature.select_all(action='SELECT')
     bpy.ops.armature.delete()
 
-    def add_bone(name, head, tail, parent_name=None):
+    def add_bone(name, head, tail, parent=None, connect=False):
+        # connect is known per call site: a child starts at its parent's
+        # tail except for the hips-to-leg and chest-to-shoulder offsets
         bone = armature.edit_bones.new(name)
-        bone.head = Vector(head)
-        bone.tail = Vector(tail)
-        if parent_name:
-            bone.parent = armature.edit_bones[parent_name]
-            bone.use_connect = (bone.head - bone.parent.tail).length < 0.001
+        bone.head = head
+        bone.tail = tail
+        if parent is not None:
+            bone.parent = parent
+            bone.use_connect = connect
         return bone
 
     cx, cy = center_x, center_y
 
     # Spine chain
-    add_bone("Hips", (cx, cy, hip_z), (cx, cy, spine_z))
-    add_bone("Spine", (cx, cy, spine_z), (cx, cy, chest_z), "Hips")
-    add_bone("Chest", (cx, cy, chest_z), (cx, cy, neck_z), "Spine")
-    add_bone("Neck", (cx, cy, neck_z), (cx, cy, neck_z + (head_z - neck_z) * 0.4), "Chest")
-    add_bone("Head", (cx, cy, neck_z + (head_z - neck_z) * 0.4), (cx, cy, head_z), "Neck")
+    hips = add_bone("Hips", (cx, cy, hip_z), (cx, cy, spine_z))
+    spine = add_bone("Spine", (cx, cy, spine_z), (cx, cy, chest_z), hips, connect=True)
+    chest = add_bone("Chest", (cx, cy, chest_z), (cx, cy, neck_z), spine, connect=True)
+    neck = add_bone("Neck", (cx, cy, neck_z), (cx, cy, neck_z + (head_z - neck_z) * 0.4), chest, connect=True)
+    add_bone("Head", (cx, cy, neck_z + (head_z - neck_z) * 0.4), (cx, cy, head_z), neck, connect=True)
 
     # Left leg
-    add_bone("UpperLeg.L", (cx + hip_offset, cy, hip_z), (cx + hip_offset, cy, knee_z), "Hips")
-    add_bone("LowerLeg.L", (cx + hip_offset, cy, knee_z), (cx + hip_offset, cy, foot_z + height * 0.05), "UpperLeg.L")
-    add_bone("Foot.L", (cx + hip_offset, cy, foot_z + height * 0.05), (cx + hip_offset, cy - height * 0.06, foot_z), "LowerLeg.L")
+    upper_leg_l = add_bone("UpperLeg.L", (cx + hip_offset, cy, hip_z), (cx + hip_offset, cy, knee_z), hips)
+    lower_leg_l = add_bone("LowerLeg.L", (cx + hip_offset, cy, knee_z), (cx + hip_offset, cy, foot_z + height * 0.05), upper_leg_l, connect=True)
+    add_bone("Foot.L", (cx + hip_offset, cy, foot_z + height * 0.05), (cx + hip_offset, cy - height * 0.06, foot_z), lower_leg_l, connect=True)
 
     # Right leg
-    add_bone("UpperLeg.R", (cx - hip_offset, cy, hip_z), (cx - hip_offset, cy, knee_z), "Hips")
-    add_bone("LowerLeg.R", (cx - hip_offset, cy, knee_z), (cx - hip_offset, cy, foot_z + height * 0.05), "UpperLeg.R")
-    add_bone("Foot.R", (cx - hip_offset, cy, foot_z + height * 0.05), (cx - hip_offset, cy - height * 0.06, foot_z), "LowerLeg.R")
+    upper_leg_r = add_bone("UpperLeg.R", (cx - hip_offset, cy, hip_z), (cx - hip_offset, cy, knee_z), hips)
+    lower_leg_r = add_bone("LowerLeg.R", (cx - hip_offset, cy, knee_z), (cx - hip_offset, cy, foot_z + height * 0.05), upper_leg_r, connect=True)
+    add_bone("Foot.R", (cx - hip_offset, cy, foot_z + height * 0.05), (cx - hip_offset, cy - height * 0.06, foot_z), lower_leg_r, connect=True)
 
     # Left arm
-    add_bone("Shoulder.L", (cx, cy, neck_z - height * 0.02), (cx + shoulder_offset, cy, neck_z - height * 0.02), "Chest")
-    add_bone("UpperArm.L", (cx + shoulder_offset, cy, neck_z - height * 0.02), (cx + elbow_offset, cy, chest_z - height * 0.02), "Shoulder.L")
-    add_bone("LowerArm.L", (cx + elbow_offset, cy, chest_z - height * 0.02), (cx + hand_offset, cy, spine_z), "UpperArm.L")
-    add_bone("Hand.L", (cx + hand_offset, cy, spine_z), (cx + hand_offset, cy, spine_z - height * 0.04), "LowerArm.L")
+    shoulder_l = add_bone("Shoulder.L", (cx, cy, neck_z - height * 0.02), (cx + shoulder_offset, cy, neck_z - height * 0.02), chest)
+    upper_arm_l = add_bone("UpperArm.L", (cx + shoulder_offset, cy, neck_z - height * 0.02), (cx + elbow_offset, cy, chest_z - height * 0.02), shoulder_l, connect=True)
+    lower_arm_l = add_bone("LowerArm.L", (cx + elbow_offset, cy, chest_z - height * 0.02), (cx + hand_offset, cy, spine_z), upper_arm_l, connect=True)
+    add_bone("Hand.L", (cx + hand_offset, cy, spine_z), (cx + hand_offset, cy, spine_z - height * 0.04), lower_arm_l, connect=True)
 
     # Right arm
-    add_bone("Shoulder.R", (cx, cy, neck_z - height * 0.02), (cx - shoulder_offset, cy, neck_z - height * 0.02), "Chest")
-    add_bone("UpperArm.R", (cx - shoulder_offset, cy, neck_z - height * 0.02), (cx - elbow_offset, cy, chest_z - height * 0.02), "Shoulder.R")
-    add_bone("LowerArm.R", (cx - elbow_offset, cy, chest_z - height * 0.02), (cx - hand_offset, cy, spine_z), "UpperArm.R")
-    add_bone("Hand.R", (cx - hand_offset, cy, spine_z), (cx - hand_offset, cy, spine_z - height * 0.04), "LowerArm.R")
+    shoulder_r = add_bone("Shoulder.R", (cx, cy, neck_z - height * 0.02), (cx - shoulder_offset, cy, neck_z - height * 0.02), chest)
+    upper_arm_r = add_bone("UpperArm.R", (cx - shoulder_offset, cy, neck_z - height * 0.02), (cx - elbow_offset, cy, chest_z - height * 0.02), shoulder_r, connect=True)
+    lower_arm_r = add_bone("LowerArm.R", (cx - elbow_offset, cy, chest_z - height * 0.02), (cx - hand_offset, cy, spine_z), upper_arm_r, connect=True)
+    add_bone("Hand.R", (cx - hand_offset, cy, spine_z), (cx - hand_offset, cy, spine_z - height * 0.04), lower_arm_r, connect=True)
 
     bpy.ops.object.mode_set(mode='OBJECT')
     return armature_obj
 
 
+def mesh_arrays(mesh_obj):
+    """World-space vertex positions (V, 3) and triangle indices (T, 3) of a mesh."""
+    mesh = mesh_obj.data
+    mesh.calc_loop_triangles()
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", co)
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int64)
+    mesh.loop_triangles.foreach_get("vertices", tris)
+    m = np.asarray(mesh_obj.matrix_world, dtype=np.float64)
+    verts = co.reshape(-1, 3) @ m[:3, :3].T + m[:3, 3]
+    return verts, tris.reshape(-1, 3)
+
+
+def cotangent_laplacian(verts, tris):
+    """
+    Cotangent Laplacian L (positive semi-definite, sparse) and the
+    barycentric vertex areas A of a triangle mesh.
+    """
+    import scipy.sparse as sp
+
+    n = len(verts)
+    rows, cols, vals = [], [], []
+    for k in range(3):
+        # Angle at corner k is opposite edge (i, j)
+        i, j = tris[:, (k + 1) % 3], tris[:, (k + 2) % 3]
+        e1 = verts[i] - verts[tris[:, k]]
+        e2 = verts[j] - verts[tris[:, k]]
+        cross = np.linalg.norm(np.cross(e1, e2), axis=1)
+        cot = np.einsum("ij,ij->i", e1, e2) / np.maximum(cross, 1e-12)
+        w = 0.5 * np.clip(cot, -1e4, 1e4)
+        rows += [i, j]
+        cols += [j, i]
+        vals += [w, w]
+    W = sp.coo_matrix(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n),
+    ).tocsr()
+    L = sp.diags(np.asarray(W.sum(axis=1)).ravel()) - W
+
+    e1 = verts[tris[:, 1]] - verts[tris[:, 0]]
+    e2 = verts[tris[:, 2]] - verts[tris[:, 0]]
+    tri_area = 0.5 * np.linalg.norm(np.cross(e1, e2), axis=1)
+    area = np.bincount(tris.ravel(), weights=np.repeat(tri_area / 3, 3), minlength=n)
+    return L, area
+
+
+def bone_distances(verts, heads, tails):
+    """Distance from every vertex to every bone segment, and the closest points: (V, B), (V, B, 3)."""
+    dist = np.empty((len(verts), len(heads)))
+    closest = np.empty((len(verts), len(heads), 3))
+    for b, (a, t) in enumerate(zip(heads, tails)):
+        d = t - a
+        s = np.clip((verts - a) @ d / max(d @ d, 1e-12), 0.0, 1.0)
+        closest[:, b] = a + s[:, None] * d
+        dist[:, b] = np.linalg.norm(verts - closest[:, b], axis=1)
+    return dist, closest
+
+
+def heat_weights(mesh_obj, armature_obj):
+    """
+    Solve the bone heat equation for every deforming bone.
+
+    Each vertex is attached to its nearest bone that it can see (no mesh
+    surface in between) with stiffness 1/d^2, and heat diffuses over the
+    surface: (L + A H) w_b = A H p_b. The system matrix is the same for all
+    bones, so it is factored once and each bone is one back-substitution.
+    Returns (bone names, (V, B) weights).
+    """
+    from scipy.sparse import diags
+    from scipy.sparse.linalg import splu
+
+    verts, tris = mesh_arrays(mesh_obj)
+    bones = [b for b in armature_obj.data.bones if b.use_deform]
+    names = [b.name for b in bones]
+    am = np.asarray(armature_obj.matrix_world, dtype=np.float64)
+    heads = np.array([b.head_local for b in bones]) @ am[:3, :3].T + am[:3, 3]
+    tails = np.array([b.tail_local for b in bones]) @ am[:3, :3].T + am[:3, 3]
+
+    L, area = cotangent_laplacian(verts, tris)
+    dist, closest = bone_distances(verts, heads, tails)
+
+    # Nearest visible bone per vertex, tested in order of distance. Only the
+    # VISIBILITY_CANDIDATES closest bones are ray cast, so the Python-level
+    # loop is O(V) casts rather than O(V * B); a vertex that sees none of
+    # them gets no heat and takes its weights from its neighbours.
+    k = min(VISIBILITY_CANDIDATES, len(bones))
+    order = np.argsort(dist, axis=1)[:, :k]
+    rows = np.arange(len(verts))[:, None]
+    cand_dist = dist[rows, order]
+    cand_dir = (closest[rows, order] - verts[:, None]) / np.maximum(cand_dist, 1e-12)[..., None]
+    bvh = BVHTree.FromPolygons(verts.tolist(), tris.tolist())
+    eps = 1e-4 * float(np.ptp(verts, axis=0).max() or 1.0)
+    nearest = np.where(cand_dist[:, 0] <= eps, order[:, 0], -1)
+    ray_cast = bvh.ray_cast
+    for v in np.flatnonzero(nearest < 0).tolist():
+        origin = Vector(verts[v])
+        for b, d, direction in zip(order[v].tolist(), cand_dist[v].tolist(), cand_dir[v].tolist()):
+            direction = Vector(direction)
+            if ray_cast(origin + direction * eps, direction, d - 2 * eps)[0] is None:
+                nearest[v] = b
+                break
+
+    visible = nearest >= 0
+    h = np.zeros(len(verts))
+    h[visible] = 1.0 / np.maximum(dist[visible, nearest[visible]], eps) ** 2
+    ah = np.maximum(area, 1e-12) * h
+    p = np.zeros((len(verts), len(bones)))
+    p[np.flatnonzero(visible), nearest[visible]] = 1.0
+
+    # The small diagonal term keeps components with no visible bone solvable
+    system = (L + diags(ah + 1e-8 * np.maximum(area, 1e-12))).tocsc()
+    weights = splu(system).solve(ah[:, None] * p)
+
+    weights = np.clip(weights, 0.0, 1.0)
+    weights[weights < MIN_WEIGHT] = 0.0
+    total = weights.sum(axis=1, keepdims=True)
+    np.divide(weights, total, out=weights, where=total > 0)
+    return names, weights
+
+
+def parent_with_heat_weights(mesh_obj, armature_obj):
+    """
+    Parent mesh to armature with bone heat weights computed here rather
+    than by the ARMATURE_AUTO operator. Returns False (having changed
+    nothing) when scipy is not installed in Blender's Python; setup.sh
+    installs it there.
+    """
+    try:
+        import scipy  # noqa: F401
+    except ImportError:
+        print("scipy not available in Blender's Python, using automatic weights")
+        return False
+
+    names, weights = heat_weights(mesh_obj, armature_obj)
+
+    for b, name in enumerate(names):
+        group = mesh_obj.vertex_groups.get(name) or mesh_obj.vertex_groups.new(name=name)
+        # Rounded to 1/1000 so vertices sharing a weight go in one add() call
+        column = np.round(weights[:, b], 3)
+        idx = np.flatnonzero(column)
+        values, inverse = np.unique(column[idx], return_inverse=True)
+        for k, value in enumerate(values):
+            group.add(idx[inverse == k].tolist(), float(value), 'REPLACE')
+
+    world = mesh_obj.matrix_world.copy()
+    mesh_obj.parent = armature_obj
+    mesh_obj.matrix_parent_inverse = armature_obj.matrix_world.inverted()
+    mesh_obj.matrix_world = world
+    modifier = mesh_obj.modifiers.new(name="Armature", type='ARMATURE')
+    modifier.object = armature_obj
+    return True
+
+
 def parent_with_automatic_weights(mesh_obj, armature_obj):
     """Parent mesh to armature with automatic weight painting."""
+    if parent_with_heat_weights(mesh_obj, armature_obj):
+        return
     bpy.ops.object.select_all(action='DESELECT')
     mesh_obj.select_set(True)
     armature_obj.select_set(True)
@@ -171,22 +353,8 @@ def export_rigged(armature_obj, mesh_obj, output_path):
         raise ValueError(f"Unsupported export format: {ext}")
 
 
-def main():
-    # Parse args after "--"
-    argv = sys.argv
-    if "--" in argv:
-        argv = argv[argv.index("--") + 1:]
-    else:
-        print("Usage: blender --background --python blender_rig.py -- input.obj output.fbx")
-        sys.exit(1)
-
-    if len(argv) < 2:
-        print("Need input and output paths")
-        sys.exit(1)
-
-    input_path = argv[0]
-    output_path = argv[1]
-
+def rig(input_path, output_path):
+    """Import a mesh, rig it with a humanoid armature and export it."""
     print(f"[rig] Input:  {input_path}")
     print(f"[rig] Output: {output_path}")
 
@@ -217,5 +385,45 @@ def main():
     print("[rig] Done.")
 
 
+def rig_batch(jobs_path):
+    """Rig every {"input", "output"} job listed in a JSONL file. Returns the failure count."""
+    failed = 0
+    with open(jobs_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            try:
+                rig(job["input"], job["output"])
+            except Exception as e:  # noqa: BLE001 - a bad mesh must not abort the rest of the batch
+                print(f"[rig] FAILED {job.get('input')}: {e}")
+                failed += 1
+    return failed
+
+
+def main():
+    # Parse args after "--"
+    argv = sys.argv
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        print("Usage: blender --background --python blender_rig.py -- input.obj output.fbx")
+        print("       blender --background --python blender_rig.py -- --batch jobs.jsonl")
+        sys.exit(1)
+
+    if len(argv) >= 2 and argv[0] == "--batch":
+        failed = rig_batch(argv[1])
+        if failed:
+            print(f"[rig] {failed} job(s) failed")
+            sys.exit(1)
+        return
+
+    if len(argv) < 2:
+        print("Need input and output paths")
+        sys.exit(1)
+
+    rig(argv[0], argv[1])
+
+
 if __name__ == "__main__":
     main()
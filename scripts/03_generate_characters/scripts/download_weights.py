@@ -2,23 +2,33 @@
 """
 Resumable download of TripoSR model weights from Hugging Face.
 
-Downloads in chunks with resume support. Safe to ctrl-C and restart.
+Streams each file over a keep-alive connection, resuming from the
+partial file with a Range request after any error. Files are fetched
+concurrently, one thread each. Safe to ctrl-C and restart. Needs
+`requests` (already pulled in by TripoSR's dependencies).
 
 Usage:
     python scripts/download_weights.py
-    python scripts/download_weights.py --chunk-size 50  # 50MB chunks
+    python scripts/download_weights.py --chunk-size 4  # 4MB reads
+    python scripts/download_weights.py --jobs 1        # one file at a time
 """
 
 import argparse
+import hashlib
+import json
+import os
+import shutil
 import sys
 import time
-import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
 HF_BASE = "https://huggingface.co"
 REPO_ID = "stabilityai/TripoSR"
+USER_AGENT = "img2char/1.0"
+WRITE_BUFFER = 4 * 1024 * 1024  # Bytes buffered before each write to the partial file
+PROGRESS_INTERVAL = 0.1  # Seconds between progress line updates
 
 # Files to download with their expected locations
 FILES = [
@@ -34,44 +44,158 @@ def hf_url(repo_id: str, filename: str) -> str:
     return f"{HF_BASE}/{repo_id}/resolve/main/{filename}"
 
 
-def get_remote_size(url: str) -> int | None:
-    """Get file size from server via HEAD request."""
-    req = urllib.request.Request(url, method="HEAD")
-    req.add_header("User-Agent", "img2char/1.0")
+def make_session(jobs: int = 1):
+    """
+    Create a keep-alive session for the downloads.
+
+    Hugging Face redirects /resolve/ URLs to its CDN, so the pool keeps up
+    to `jobs` connections per host, one per concurrent download. Transient
+    5xx responses and connection failures are retried with backoff by urllib3.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.headers["Accept-Encoding"] = "identity"  # byte ranges of the raw file
+    retry = Retry(
+        total=10,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET"],
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=jobs, max_retries=retry))
+    return session
+
+
+def get_remote_info(session, url: str) -> tuple[int | None, str | None]:
+    """
+    Get file size and SHA-256 from the server via HEAD request.
+
+    For LFS files the /resolve/ redirect carries the content hash in
+    X-Linked-Etag; plain git files only have a blob hash, so the SHA-256
+    is None for them.
+    """
+    import requests
+
+    try:
+        resp = session.head(url, allow_redirects=True, timeout=30)
+    except requests.exceptions.RequestException:
+        return None, None
+    if not resp.ok:
+        return None, None
+
+    size = resp.headers.get("Content-Length")
+    sha256 = None
+    for r in (*resp.history, resp):
+        etag = r.headers.get("X-Linked-Etag", "").strip('"').removeprefix("W/").strip('"')
+        if len(etag) == 64:
+            sha256 = etag.lower()
+            break
+    return (int(size) if size else None), sha256
+
+
+def meta_path(dest: Path) -> Path:
+    """Sidecar recording what we know about the remote file."""
+    return dest.with_suffix(dest.suffix + ".meta.json")
+
+
+def cached_remote_info(session, url: str, dest: Path) -> tuple[int | None, str | None]:
+    """Remote size and SHA-256 from the sidecar if it is for this URL, else via HEAD (then cached)."""
+    meta = meta_path(dest)
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            size = resp.headers.get("Content-Length")
-            return int(size) if size else None
-    except urllib.error.URLError:
-        return None
+        cached = json.loads(meta.read_text())
+        if cached.get("url") == url and cached.get("size"):
+            return cached["size"], cached.get("sha256")
+    except (OSError, ValueError):
+        pass
+
+    size, sha256 = get_remote_info(session, url)
+    if size is not None:
+        meta.parent.mkdir(parents=True, exist_ok=True)
+        meta.write_text(json.dumps({"url": url, "size": size, "sha256": sha256}))
+    return size, sha256
+
+
+def forget_remote_info(dest: Path) -> None:
+    """Drop the sidecar so the next run asks the server again."""
+    meta_path(dest).unlink(missing_ok=True)
+
 
+def content_range_total(resp) -> int | None:
+    """Total size from a 206 response's Content-Range ("bytes a-b/total")."""
+    total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
 
-def download_with_resume(url: str, dest: Path, chunk_size_mb: int = 10) -> bool:
+
+def sha256_file(path: Path, block_mb: int = 16) -> str:
+    """SHA-256 of a file, read in blocks into one reused buffer."""
+    h = hashlib.sha256()
+    buf = bytearray(block_mb * 1024 * 1024)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while n := f.readinto(buf):
+            h.update(view[:n])
+        drop_cache(f.fileno())
+    return h.hexdigest()
+
+
+def drop_cache(fd: int) -> None:
+    """
+    Tell the kernel we are done with a file's cached pages.
+
+    The partial file is written once and read once (by the hash check), so
+    keeping 5 GB of it in the page cache only pushes out other programs'
+    data. Pages not yet written back stay until they are. No-op where
+    posix_fadvise does not exist (Windows, macOS).
+    """
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def download_with_resume(session, url: str, dest: Path, chunk_size_mb: int = 1) -> bool:
     """
     Download a file with resume support.
     Returns True if download completed, False if interrupted.
+
+    The remaining bytes come from a single streaming GET, read
+    chunk_size_mb at a time; after an error the next request resumes from
+    the end of the partial file. A read cut short by a dropped connection
+    is lost, so large chunks cost more on flaky links.
     """
+    import requests
+
     partial = dest.with_suffix(dest.suffix + ".partial")
     chunk_bytes = chunk_size_mb * 1024 * 1024
 
     # Get total size
-    remote_size = get_remote_size(url)
+    remote_size, remote_sha256 = cached_remote_info(session, url, dest)
     if remote_size is None:
         print(f"    WARNING: Could not determine file size for {url}")
 
     # Check if already fully downloaded
     if dest.exists():
-        if remote_size and dest.stat().st_size == remote_size:
+        dest_size = dest.stat().st_size
+        if remote_size and dest_size == remote_size:
             print(f"    Already downloaded: {dest.name} ({format_size(remote_size)})")
             return True
-        # Size mismatch — re-download
-        dest.unlink()
+        if remote_size and dest_size < remote_size and not partial.exists():
+            # Truncated: resume from it rather than starting over
+            dest.rename(partial)
+        else:
+            dest.unlink()
 
     # Resume from partial
     existing_size = partial.stat().st_size if partial.exists() else 0
     if existing_size > 0:
         if remote_size and existing_size >= remote_size:
-            # Partial is complete, rename
+            # Partial is complete, verify and rename
+            if not verify_sha256(partial, remote_sha256):
+                forget_remote_info(dest)
+                return False
             partial.rename(dest)
             print(f"    Completed (from partial): {dest.name}")
             return True
@@ -86,71 +210,76 @@ def download_with_resume(url: str, dest: Path, chunk_size_mb: int = 10) -> bool:
 
     dest.parent.mkdir(parents=True, exist_ok=True)
 
+    # Bytes in the partial file, kept by counting what we write rather than
+    # by a stat() per request
+    current_size = existing_size
     while True:
-        current_size = partial.stat().st_size if partial.exists() else 0
-
         # Check if done
         if remote_size and current_size >= remote_size:
             break
 
-        # Build range request
-        range_end = current_size + chunk_bytes - 1
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", "img2char/1.0")
-        req.add_header("Range", f"bytes={current_size}-{range_end}")
-
         try:
             t0 = time.monotonic()
             bytes_this_request = 0
-            read_chunk = 1024 * 1024  # Stream 1MB at a time to avoid IncompleteRead
-
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                with open(partial, "ab") as f:
-                    while True:
-                        piece = resp.read(read_chunk)
-                        if not piece:
-                            break
-                        f.write(piece)
-                        f.flush()
-                        bytes_this_request += len(piece)
-
-                        new_size = current_size + bytes_this_request
-                        elapsed = time.monotonic() - t0
-                        speed = bytes_this_request / elapsed if elapsed > 0 else 0
 
-                        if remote_size:
-                            pct = new_size * 100 // remote_size
-                            print(
-                                f"\r    {format_size(new_size)} / {format_size(remote_size)} "
-                                f"({pct}%) - {format_size(speed)}/s   ",
-                                end="",
-                                flush=True,
-                            )
+            headers = {"Range": f"bytes={current_size}-"} if current_size else {}
+            with session.get(url, headers=headers, stream=True, timeout=60) as resp:
+                if resp.status_code == 416:
+                    break  # Nothing left past current_size
+                resp.raise_for_status()
+                # A 200 means the server ignored the Range: start over
+                if resp.status_code != 206:
+                    current_size = 0
+                else:
+                    total = content_range_total(resp)
+                    if remote_size and total and total != remote_size:
+                        # The cached size is stale: trust the server from now on
+                        print(f"\n    Remote size changed: {total}, cached {remote_size}")
+                        forget_remote_info(dest)
+                        remote_size, remote_sha256 = total, None
+                # Large buffer, no per-piece flush: closing the file (also on
+                # error or ctrl-C) writes out everything received
+                with open(partial, "ab" if current_size else "wb", buffering=WRITE_BUFFER) as f:
+                    out = ProgressWriter(f, dest.name, current_size, remote_size)
+                    resp.raw.decode_content = True
+                    try:
+                        shutil.copyfileobj(resp.raw, out, chunk_bytes)
+                    finally:
+                        bytes_this_request = out.written
+                        f.flush()
+                        drop_cache(f.fileno())
 
+            current_size += bytes_this_request
             if bytes_this_request > 0:
+                if remote_size:
+                    elapsed = time.monotonic() - t0
+                    print_progress(dest.name, current_size, remote_size,
+                                   bytes_this_request / elapsed if elapsed > 0 else 0)
                 print()  # newline after progress
 
-            if bytes_this_request == 0:
+            # Stream ended: done unless the known size says bytes are missing
+            if bytes_this_request == 0 or not remote_size:
                 break
 
-            # If we got less than a full chunk, we're done
-            if bytes_this_request < chunk_bytes:
-                break
-
-        except (urllib.error.URLError, TimeoutError, ConnectionError, OSError,
+        except (requests.exceptions.RequestException, TimeoutError, ConnectionError, OSError,
                 Exception) as e:
-            # Save whatever was written so far — it's already flushed to disk
-            saved = partial.stat().st_size if partial.exists() else 0
+            # Whatever was received is on disk: the file was closed on the way
+            # out. Ask the filesystem how much, in case the close itself failed.
+            current_size = partial.stat().st_size if partial.exists() else 0
             print(f"\n    Network error: {type(e).__name__}: {e}")
-            print(f"    Progress saved at {format_size(saved)}. Retrying in 5s...")
+            print(f"    Progress saved at {format_size(current_size)}. Retrying in 5s...")
             time.sleep(5)
             continue
 
     # Verify final size
-    final_size = partial.stat().st_size if partial.exists() else 0
-    if remote_size and final_size != remote_size:
-        print(f"    WARNING: Size mismatch: got {final_size}, expected {remote_size}")
-        print(f"    Run again to retry from {format_size(final_size)}")
+    if remote_size and current_size != remote_size:
+        print(f"    WARNING: Size mismatch: got {current_size}, expected {remote_size}")
+        print(f"    Run again to retry from {format_size(current_size)}")
+        forget_remote_info(dest)
+        return False
+
+    if not verify_sha256(partial, remote_sha256):
+        forget_remote_info(dest)
         return False
 
     partial.rename(dest)
@@ -158,6 +287,64 @@ def download_with_resume(url: str, dest: Path, chunk_size_mb: int = 10) -> bool:
     return True
 
 
+def verify_sha256(partial: Path, expected: str | None) -> bool:
+    """
+    Check a complete partial file against the remote SHA-256.
+
+    A few seconds of hashing (hashlib uses OpenSSL's SHA extensions where
+    the CPU has them) instead of trusting the size alone. On mismatch the
+    partial is dropped, since there is no telling which bytes are bad.
+    """
+    if not expected:
+        return True
+    print(f"    Verifying {partial.name} (SHA-256)...")
+    got = sha256_file(partial)
+    if got == expected:
+        return True
+    print(f"    WARNING: SHA-256 mismatch: got {got}, expected {expected}")
+    print("    Removed the corrupt download. Run again to re-download.")
+    partial.unlink()
+    return False
+
+
+class ProgressWriter:
+    """
+    Write-through wrapper for the partial file that counts the bytes
+    written and redraws the progress line, so shutil.copyfileobj can
+    drive the copy loop.
+    """
+
+    def __init__(self, f, name: str, start: int, total: int | None):
+        self.f = f
+        self.name = name
+        self.start = start
+        self.total = total
+        self.written = 0
+        self.t0 = self.last_print = time.monotonic()
+
+    def write(self, data) -> int:
+        n = self.f.write(data)
+        self.written += n
+        # One progress update per PROGRESS_INTERVAL, not one terminal write
+        # per read
+        now = time.monotonic()
+        if self.total and now - self.last_print >= PROGRESS_INTERVAL:
+            self.last_print = now
+            print_progress(self.name, self.start + self.written, self.total,
+                           self.written / (now - self.t0))
+        return n
+
+
+def print_progress(name: str, done: int, total: int, speed: float) -> None:
+    """Overwrite the progress line for one file."""
+    print(
+        f"\r    {name}: {format_size(done)} / {format_size(total)} "
+        f"({done * 100 // total}%) - {format_size(speed)}/s   ",
+        end="",
+        flush=True,
+    )
+
+
 def format_size(n: int | float) -> str:
     if n >= 1_000_000_000:
         return f"{n / 1_000_000_000:.2f} GB"
@@ -171,8 +358,12 @@ def format_size(n: int | float) -> str:
 def main():
     parser = argparse.ArgumentParser(description="Download TripoSR weights (resumable)")
     parser.add_argument(
-        "--chunk-size", type=int, default=10,
-        help="Download chunk size in MB (default: 10)",
+        "--chunk-size", type=int, default=1,
+        help="Read size per write in MB; a dropped connection loses up to one read (default: 1)",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=4,
+        help="Files downloaded concurrently (default: 4)",
     )
     parser.add_argument(
         "--dest", type=str, default=None,
@@ -186,16 +377,20 @@ def main():
 
     print(f"=== TripoSR weight download ===")
     print(f"  Destination: {dest_dir}")
-    print(f"  Chunk size:  {args.chunk_size} MB")
+    print(f"  Read size:   {args.chunk_size} MB")
     print()
 
-    all_ok = True
-    for filename, local_name in FILES:
-        url = hf_url(REPO_ID, filename)
-        dest = dest_dir / local_name
-        ok = download_with_resume(url, dest, args.chunk_size)
-        if not ok:
-            all_ok = False
+    # I/O-bound: the threads spend their time in socket reads and file
+    # writes, both of which release the GIL
+    jobs = max(1, min(args.jobs, len(FILES)))
+    with make_session(jobs) as session, ThreadPoolExecutor(max_workers=jobs) as ex:
+        results = list(ex.map(
+            lambda fl: download_with_resume(
+                session, hf_url(REPO_ID, fl[0]), dest_dir / fl[1], args.chunk_size
+            ),
+            FILES,
+        ))
+    all_ok = all(results)
 
     if all_ok:
         print(f"\n  All weights downloaded to {dest_dir}")
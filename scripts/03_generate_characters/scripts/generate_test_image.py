@@ -1,18 +1,21 @@
 #!/usr/bin/env python3
 """Generate a simple test image (silhouette of a person) for pipeline testing."""
 
-from PIL import Image, ImageDraw
 import sys
 from pathlib import Path
 
+import numpy as np
 
-def draw_person(img: Image.Image):
-    """Draw a simple humanoid silhouette on a white background."""
-    w, h = img.size
-    draw = ImageDraw.Draw(img)
 
+def draw_person(w: int, h: int) -> np.ndarray:
+    """Draw a simple humanoid silhouette on a white background as an (h, w, 3) uint8 array."""
     # White background
-    draw.rectangle([0, 0, w, h], fill=(255, 255, 255))
+    arr = np.full((h, w, 3), 255, dtype=np.uint8)
+
+    def rectangle(box, fill):
+        # Bounds are inclusive, as with ImageDraw.rectangle
+        x0, y0, x1, y1 = box
+        arr[max(y0, 0):y1 + 1, max(x0, 0):x1 + 1] = fill
 
     cx = w // 2
     skin = (210, 180, 140)
@@ -23,18 +26,19 @@ def draw_person(img: Image.Image):
     # Head
     head_r = int(h * 0.06)
     head_y = int(h * 0.10)
-    draw.ellipse([cx - head_r, head_y - head_r, cx + head_r, head_y + head_r], fill=skin)
+    yy, xx = np.ogrid[:h, :w]
+    arr[(xx - cx) ** 2 + (yy - head_y) ** 2 <= head_r ** 2] = skin
 
     # Neck
     neck_w = int(h * 0.02)
     neck_top = head_y + head_r
     neck_bot = int(h * 0.18)
-    draw.rectangle([cx - neck_w, neck_top, cx + neck_w, neck_bot], fill=skin)
+    rectangle([cx - neck_w, neck_top, cx + neck_w, neck_bot], fill=skin)
 
     # Torso
     torso_w = int(h * 0.10)
     torso_bot = int(h * 0.50)
-    draw.rectangle([cx - torso_w, neck_bot, cx + torso_w, torso_bot], fill=shirt)
+    rectangle([cx - torso_w, neck_bot, cx + torso_w, torso_bot], fill=shirt)
 
     # Arms
     arm_w = int(h * 0.03)
@@ -42,13 +46,13 @@ def draw_person(img: Image.Image):
     arm_bot = int(h * 0.45)
 
     # Left arm
-    draw.rectangle([cx - torso_w - arm_w * 2, arm_top, cx - torso_w, arm_bot], fill=shirt)
+    rectangle([cx - torso_w - arm_w * 2, arm_top, cx - torso_w, arm_bot], fill=shirt)
     # Hand
-    draw.rectangle([cx - torso_w - arm_w * 2, arm_bot, cx - torso_w, arm_bot + int(h * 0.03)], fill=skin)
+    rectangle([cx - torso_w - arm_w * 2, arm_bot, cx - torso_w, arm_bot + int(h * 0.03)], fill=skin)
 
     # Right arm
-    draw.rectangle([cx + torso_w, arm_top, cx + torso_w + arm_w * 2, arm_bot], fill=shirt)
-    draw.rectangle([cx + torso_w, arm_bot, cx + torso_w + arm_w * 2, arm_bot + int(h * 0.03)], fill=skin)
+    rectangle([cx + torso_w, arm_top, cx + torso_w + arm_w * 2, arm_bot], fill=shirt)
+    rectangle([cx + torso_w, arm_bot, cx + torso_w + arm_w * 2, arm_bot + int(h * 0.03)], fill=skin)
 
     # Legs
     leg_w = int(h * 0.04)
@@ -56,23 +60,25 @@ def draw_person(img: Image.Image):
     leg_bot = int(h * 0.88)
 
     # Left leg
-    draw.rectangle([cx - leg_gap - leg_w * 2, torso_bot, cx - leg_gap, leg_bot], fill=pants)
+    rectangle([cx - leg_gap - leg_w * 2, torso_bot, cx - leg_gap, leg_bot], fill=pants)
     # Right leg
-    draw.rectangle([cx + leg_gap, torso_bot, cx + leg_gap + leg_w * 2, leg_bot], fill=pants)
+    rectangle([cx + leg_gap, torso_bot, cx + leg_gap + leg_w * 2, leg_bot], fill=pants)
 
     # Shoes
     shoe_h = int(h * 0.04)
-    draw.rectangle([cx - leg_gap - leg_w * 2 - int(h * 0.01), leg_bot, cx - leg_gap + int(h * 0.02), leg_bot + shoe_h], fill=shoe)
-    draw.rectangle([cx + leg_gap - int(h * 0.02), leg_bot, cx + leg_gap + leg_w * 2 + int(h * 0.01), leg_bot + shoe_h], fill=shoe)
+    rectangle([cx - leg_gap - leg_w * 2 - int(h * 0.01), leg_bot, cx - leg_gap + int(h * 0.02), leg_bot + shoe_h], fill=shoe)
+    rectangle([cx + leg_gap - int(h * 0.02), leg_bot, cx + leg_gap + leg_w * 2 + int(h * 0.01), leg_bot + shoe_h], fill=shoe)
+
+    return arr
 
 
 def main():
+    from PIL import Image
+
     output = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("input/test_character.png")
     output.parent.mkdir(parents=True, exist_ok=True)
 
-    img = Image.new("RGB", (512, 768), (255, 255, 255))
-    draw_person(img)
-    img.save(output)
+    Image.fromarray(draw_person(512, 768), "RGB").save(output)
     print(f"Test image saved to {output}")
 
 
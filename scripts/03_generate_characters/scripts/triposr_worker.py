@@ -0,0 +1,139 @@
+"""
+Long-lived TripoSR worker: loads the model once, then meshes images on demand.
+
+Started by pipeline.py (one process per mesh worker) with cwd set to the
+TripoSR checkout:
+    python triposr_worker.py --device cuda:0 --triposr-dir tmp/TripoSR
+
+Protocol: one JSON request per line on stdin,
+    {"image": "...", "output_dir": "...", "mc_resolution": 256, "bake_texture": false,
+     "max_faces": 5000}
+answered by one JSON reply per line on stdout,
+    {"ok": true, "mesh": ".../0/mesh.obj", "faces": [12000, 5000]}  or  {"ok": false, "error": "..."}
+
+"max_faces" is optional. Without texture baking the mesh is decimated in
+memory before it is exported, and "faces" reports (original, final) counts;
+otherwise "faces" is null and the pipeline decimates the written file.
+
+The output layout matches TripoSR's run.py for a single image
+(<output_dir>/0/input.png and <output_dir>/0/mesh.obj), so the pipeline
+treats both paths the same. Anything the model libraries print goes to
+stderr; stdout carries only protocol replies.
+"""
+
+import argparse
+import json
+import os
+import sys
+import traceback
+
+# Same defaults as TripoSR's run.py
+CHUNK_SIZE = 8192
+FOREGROUND_RATIO = 0.85
+TEXTURE_RESOLUTION = 2048
+
+
+def load_model(model_path: str, device: str):
+    from tsr.system import TSR  # type: ignore[import-not-found]
+
+    model = TSR.from_pretrained(model_path, config_name="config.yaml", weight_name="model.ckpt")
+    model.renderer.set_chunk_size(CHUNK_SIZE)
+    model.to(device)
+    return model
+
+
+def preprocess(image_path: str, rembg_session):
+    """Remove the background and composite on gray, as run.py does."""
+    import numpy as np
+    from PIL import Image
+    from tsr.utils import remove_background, resize_foreground  # type: ignore[import-not-found]
+
+    image = remove_background(Image.open(image_path), rembg_session)
+    image = resize_foreground(image, FOREGROUND_RATIO)
+    arr = np.array(image).astype(np.float32) / 255.0
+    arr = arr[:, :, :3] * arr[:, :, 3:4] + (1 - arr[:, :, 3:4]) * 0.5
+    return Image.fromarray((arr * 255.0).astype(np.uint8))
+
+
+def generate(model, rembg_session, device: str, request: dict) -> tuple[str, list[int] | None]:
+    """Mesh one image; return the written mesh path and decimation face counts."""
+    import numpy as np
+    import torch  # type: ignore[import-not-found]
+    from PIL import Image
+
+    out_dir = os.path.join(request["output_dir"], "0")
+    os.makedirs(out_dir, exist_ok=True)
+
+    image = preprocess(request["image"], rembg_session)
+    image.save(os.path.join(out_dir, "input.png"))
+
+    bake = bool(request.get("bake_texture"))
+    with torch.no_grad():
+        scene_codes = model([image], device=device)
+    meshes = model.extract_mesh(scene_codes, not bake, resolution=request["mc_resolution"])
+
+    mesh_path = os.path.join(out_dir, "mesh.obj")
+    faces = None
+    if bake:
+        import xatlas  # type: ignore[import-not-found]
+        from tsr.bake_texture import bake_texture  # type: ignore[import-not-found]
+
+        bake_output = bake_texture(meshes[0], model, scene_codes[0], TEXTURE_RESOLUTION)
+        xatlas.export(
+            mesh_path,
+            meshes[0].vertices[bake_output["vmapping"]],
+            bake_output["indices"],
+            bake_output["uvs"],
+            meshes[0].vertex_normals[bake_output["vmapping"]],
+        )
+        texture = Image.fromarray((bake_output["colors"] * 255.0).astype(np.uint8))
+        texture.transpose(Image.FLIP_TOP_BOTTOM).save(os.path.join(out_dir, "texture.png"))
+    else:
+        mesh = meshes[0]
+        max_faces = request.get("max_faces")
+        if max_faces is not None:
+            faces = [len(mesh.faces), len(mesh.faces)]
+            if faces[0] > max_faces:
+                mesh = mesh.simplify_quadric_decimation(face_count=max_faces)
+                faces[1] = len(mesh.faces)
+        mesh.export(mesh_path)
+
+    return mesh_path, faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent TripoSR mesh worker")
+    parser.add_argument("--device", default="cpu", help="Compute device (default: cpu)")
+    parser.add_argument("--pretrained-model-name-or-path", default="stabilityai/TripoSR",
+                        help="Local weights directory or Hugging Face repo id")
+    parser.add_argument("--triposr-dir", default=".", help="TripoSR checkout (for the tsr package)")
+    args = parser.parse_args()
+
+    # Keep the real stdout for replies and send every other write to stderr
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    sys.path.insert(0, os.path.abspath(args.triposr_dir))
+
+    import rembg  # type: ignore[import-not-found]
+
+    print(f"[triposr-worker] Loading model on {args.device}...", file=sys.stderr)
+    model = load_model(args.pretrained_model_name_or_path, args.device)
+    rembg_session = rembg.new_session()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            mesh_path, faces = generate(model, rembg_session, args.device, json.loads(line))
+            reply = {"ok": True, "mesh": mesh_path, "faces": faces}
+        except Exception as e:  # noqa: BLE001 - any failure becomes an error reply; the worker keeps serving
+            traceback.print_exc(file=sys.stderr)
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        replies.write(json.dumps(reply) + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,129 +1,273 @@
 import numpy as np
-from scipy.io import wavfile
+from functools import cache
+import itertools
 import os
+import struct
 
-# Setup output directory
+# Output directory
 folder = "tmp/game_sfx"
-if not os.path.exists(folder):
-    os.makedirs(folder)
 
 SR = 44100  # Sample Rate
+DTYPE = np.float32  # Synthesis sample type; output is int16, so float32 is plenty
 
+# Seeded PCG64 generator: faster than the legacy global RandomState, and
+# the same sounds come out on every run. Reseeded per sound by render().
+rng = np.random.default_rng(0)
 
-def save(name, data, vol_mod=1.0):
-    # Normalize and apply volume modifier from the table
-    if np.max(np.abs(data)) > 0:
-        data = data / np.max(np.abs(data))
-    data = data * vol_mod
+
+# int16 scratch buffer reused by save(), grown to the longest clip so far
+_pcm = np.empty(0, dtype=np.int16)
+
+
+def write_wav(path, pcm, repeat=1):
+    """Write mono 16-bit PCM samples, played `repeat` times in a row, as a
+    WAV file (44-byte header + data)."""
+    data = pcm.astype("<i2", copy=False).tobytes()
+    size = len(data) * repeat
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + size, b"WAVE",
+        b"fmt ", 16, 1, 1, SR, SR * 2, 2, 16,
+        b"data", size,
+    )
+    with open(path, "wb", buffering=1 << 20) as f:
+        f.write(header)
+        f.writelines(itertools.repeat(data, repeat))
+
+
+def save(name, data, vol_mod=1.0, repeat=1):
+    global _pcm
+    # Normalize and apply volume modifier from the table, scaling straight
+    # into the int16 buffer (truncating, like astype)
+    # The peak from two reductions, without an np.abs() copy of the buffer
+    peak = max(data.max(), -data.min())
+    scale = 32767 * vol_mod / peak if peak > 0 else 32767 * vol_mod
+    if len(_pcm) < len(data):
+        _pcm = np.empty(len(data), dtype=np.int16)
+    pcm = _pcm[:len(data)]
+    np.multiply(data, scale, out=pcm, casting="unsafe")
     path = os.path.join(folder, name.replace(".ogg", ".wav"))
-    wavfile.write(path, SR, (data * 32767).astype(np.int16))
+    # Repeats share the peak, so they are written from the same samples
+    # rather than from a tiled copy
+    write_wav(path, pcm, repeat)
 
 
 def env(data, a=0.01, d=0.1, s=0.5, r=0.1):
-    """Simple ADSR Envelope"""
+    """Simple ADSR Envelope, applied to `data` in place (and returned)
+
+    Each segment is a linear ramp in the sample index (the same values
+    np.linspace would give), selected per sample, so the envelope is built
+    in a few whole-buffer passes. As before, the stretch between decay and
+    release stays at 1. The ramps are computed in place, so the only
+    buffers allocated are the index, the three ramps and the selection.
+    """
     n = len(data)
-    a_s, d_s, r_s = int(a * SR), int(d * SR), int(r * SR)
-    envelope = np.ones(n)
-    if a_s > 0:
-        a_s = min(a_s, n)
-        envelope[:a_s] = np.linspace(0, 1, a_s)
-    remaining = n - a_s
-    if d_s > 0:
-        d_s = min(d_s, remaining)
-        envelope[a_s : a_s + d_s] = np.linspace(1, s, d_s)
-    if r_s > 0:
-        r_s = min(r_s, n)
-        envelope[-r_s:] = np.linspace(s, 0, r_s)
-    return data * envelope
+    a_s = min(int(a * SR), n)
+    d_s = min(int(d * SR), n - a_s)
+    r_s = min(int(r * SR), n)
+    i = np.arange(n, dtype=DTYPE)
+    attack = i / max(a_s - 1, 1)
+    decay = i - a_s
+    decay *= 1 - s
+    decay /= max(d_s - 1, 1)
+    np.subtract(1, decay, out=decay)
+    release = i - (n - r_s)
+    release /= max(r_s - 1, 1)
+    np.subtract(1, release, out=release)
+    release *= s
+    envelope = np.where(i < a_s, attack, np.where(i < a_s + d_s, decay, 1.0))
+    envelope = np.where(i >= n - r_s, release, envelope)
+    data *= envelope
+    return data
 
 
 def noise(dur):
-    return np.random.uniform(-1, 1, int(SR * dur))
+    x = rng.random(int(SR * dur), dtype=DTYPE)
+    x *= 2
+    x -= 1
+    return x
+
+
+@cache
+def time_axis(dur):
+    """Sample times for a clip of `dur` seconds (shared; do not modify)."""
+    return np.linspace(0, dur, int(SR * dur), dtype=DTYPE)
 
 
 def sine(freq, dur):
-    t = np.linspace(0, dur, int(SR * dur))
-    return np.sin(2 * np.pi * freq * t)
+    x = np.multiply(2 * np.pi * freq, time_axis(dur))
+    return np.sin(x, out=x)
+
+
+def boxcar(x, k):
+    """Moving average of width k: np.convolve(x, np.ones(k) / k, mode="same") for len(x) >= k.
+
+    Uses a running sum (O(n) rather than O(n*k)); the sum is kept in
+    float64 so the differences don't lose precision.
+    """
+    padded = np.pad(x, (k // 2, (k - 1) // 2))
+    c = np.concatenate(([0.0], np.cumsum(padded, dtype=np.float64)))
+    return ((c[k:] - c[:-k]) / k).astype(x.dtype)
 
 
 # --- GENERATORS BY TYPE ---
+# Each returns the raw buffer for one sound; save() normalizes it. env()
+# scales its argument in place, so pass it a fresh buffer, never a shared
+# one such as time_axis().
 
-print("🔊 Starting full sound synthesis...")
 
 # 1-3. FOOTSTEPS (Dirt, Water, Stone)
-t_foot = 0.2
-f_dirt = env(noise(t_foot) * 0.3, r=0.1)
-save("footstep.ogg", f_dirt, 0.3)
+def footstep():
+    t_foot = 0.2
+    return env(noise(t_foot) * 0.3, r=0.1)
+
+
+def footstep_water():
+    return env(boxcar(noise(0.3), 20), r=0.15)
 
-f_water = env(np.convolve(noise(0.3), np.ones(20) / 20, mode="same"), r=0.15)
-save("footstep_water.ogg", f_water, 0.3)
 
-f_stone = env(np.diff(noise(0.2), prepend=0), a=0.005, r=0.05)
-save("footstep_stone.ogg", f_stone, 0.3)
+def footstep_stone():
+    return env(np.diff(noise(0.2), prepend=0), a=0.005, r=0.05)
+
 
 # 4-6. COMBAT (Hit, Miss, Crit)
-save("hit.ogg", env(sine(150, 0.4) + noise(0.4) * 0.5, a=0.01, r=0.2), 0.6)
-save(
-    "miss.ogg",
-    env(np.linspace(1200, 400, int(SR * 0.3)) * noise(0.3) * 0.1, r=0.2),
-    0.3,
-)
-save("critical.ogg", env(sine(80, 0.6) + noise(0.6) * 0.8, a=0.01, r=0.4), 1.0)
+def hit():
+    return env(sine(150, 0.4) + noise(0.4) * 0.5, a=0.01, r=0.2)
+
+
+def miss():
+    return env(np.linspace(1200, 400, int(SR * 0.3), dtype=DTYPE) * noise(0.3) * 0.1, r=0.2)
+
+
+def critical():
+    return env(sine(80, 0.6) + noise(0.6) * 0.8, a=0.01, r=0.4)
+
 
 # 7-9. DEATH & HURT
-save("hurt.ogg", env(sine(200, 0.5) * noise(0.5), a=0.05, r=0.3), 0.6)
-save(
-    "monster_death.ogg",
-    env(np.linspace(300, 50, int(SR * 0.8)) * noise(0.8), r=0.6),
-    0.5,
-)
-# Player Death: Long descending tone
-t_pd = np.linspace(0, 2.0, int(SR * 2.0))
-p_death = np.sin(2 * np.pi * np.linspace(400, 100, len(t_pd)) * t_pd) * noise(2.0)
-save("player_death.ogg", env(p_death, r=1.5), 0.8)
+def hurt():
+    return env(sine(200, 0.5) * noise(0.5), a=0.05, r=0.3)
+
+
+def monster_death():
+    return env(np.linspace(300, 50, int(SR * 0.8), dtype=DTYPE) * noise(0.8), r=0.6)
+
+
+def player_death():
+    # Long descending tone
+    t_pd = time_axis(2.0)
+    p_death = np.sin(2 * np.pi * np.linspace(400, 100, len(t_pd), dtype=DTYPE) * t_pd) * noise(2.0)
+    return env(p_death, r=1.5)
+
 
 # 10-12. ITEMS (Pickup, Drop, Equip)
-save("pickup.ogg", env(sine(1200, 0.2), a=0.01, r=0.1), 0.3)
-save("drop.ogg", env(noise(0.2) * 0.5, r=0.1), 0.3)
-save("equip.ogg", env(noise(0.5) * sine(400, 0.5), a=0.05, r=0.2), 0.5)
+def pickup():
+    return env(sine(1200, 0.2), a=0.01, r=0.1)
+
+
+def drop():
+    return env(noise(0.2) * 0.5, r=0.1)
+
+
+def equip():
+    return env(noise(0.5) * sine(400, 0.5), a=0.05, r=0.2)
+
 
 # 13-14. CONSUMABLES (Eat, Drink)
-save(
-    "eat.ogg",
-    env(
-        noise(0.7) * np.sin(2 * np.pi * 15 * np.linspace(0, 0.7, int(SR * 0.7))), r=0.2
-    ),
-    0.5,
-)
-save(
-    "drink.ogg",
-    env(sine(200 + 100 * np.sin(np.linspace(0, 10, int(SR * 0.8))), 0.8), r=0.3),
-    0.5,
-)
+def eat():
+    return env(noise(0.7) * np.sin(2 * np.pi * 15 * time_axis(0.7)), r=0.2)
+
+
+def drink():
+    return env(sine(200 + 100 * np.sin(np.linspace(0, 10, int(SR * 0.8), dtype=DTYPE)), 0.8), r=0.3)
+
 
 # 15-16. DOORS
-save(
-    "door_open.ogg",
-    env(np.linspace(100, 250, int(SR * 0.6)) * noise(0.6), a=0.1, r=0.2),
-    0.5,
-)
-save("door_close.ogg", env(noise(0.5) + sine(60, 0.5), a=0.01, r=0.1), 0.6)
+def door_open():
+    return env(np.linspace(100, 250, int(SR * 0.6), dtype=DTYPE) * noise(0.6), a=0.1, r=0.2)
+
+
+def door_close():
+    return env(noise(0.5) + sine(60, 0.5), a=0.01, r=0.1)
 
-# 17. STAIRS (Rapid footsteps)
-stairs = np.tile(f_stone, 4)
-save("stairs.ogg", stairs, 0.5)
 
 # 18-19. MENU
-save("menu_select.ogg", env(sine(880, 0.1), a=0.005, r=0.05), 0.3)
-save("menu_back.ogg", env(sine(440, 0.1), a=0.005, r=0.05), 0.3)
+def menu_select():
+    return env(sine(880, 0.1), a=0.005, r=0.05)
+
+
+def menu_back():
+    return env(sine(440, 0.1), a=0.005, r=0.05)
+
 
 # 20-21. REWARDS (Level Up, Secret)
-lvl = env(sine(523, 2.0) + sine(659, 2.0) + sine(784, 2.0), a=0.2, r=1.0)
-save("level_up.ogg", lvl, 0.8)
-sec = env(sine(880, 1.2) + sine(1108, 1.2), a=0.1, r=0.8)
-save("secret.ogg", sec, 0.6)
+def level_up():
+    return env(sine(523, 2.0) + sine(659, 2.0) + sine(784, 2.0), a=0.2, r=1.0)
+
+
+def secret():
+    return env(sine(880, 1.2) + sine(1108, 1.2), a=0.1, r=0.8)
+
 
 # 22. TRAP
-save("trap.ogg", env(noise(0.6) * 2, a=0.001, r=0.1), 0.9)
+def trap():
+    return env(noise(0.6) * 2, a=0.001, r=0.1)
+
+
+# (file name, generator, volume). 17 (stairs) is built from footstep_stone
+# in main() so it repeats the exact same step.
+SOUNDS = [
+    ("footstep.ogg", footstep, 0.3),
+    ("footstep_water.ogg", footstep_water, 0.3),
+    ("footstep_stone.ogg", footstep_stone, 0.3),
+    ("hit.ogg", hit, 0.6),
+    ("miss.ogg", miss, 0.3),
+    ("critical.ogg", critical, 1.0),
+    ("hurt.ogg", hurt, 0.6),
+    ("monster_death.ogg", monster_death, 0.5),
+    ("player_death.ogg", player_death, 0.8),
+    ("pickup.ogg", pickup, 0.3),
+    ("drop.ogg", drop, 0.3),
+    ("equip.ogg", equip, 0.5),
+    ("eat.ogg", eat, 0.5),
+    ("drink.ogg", drink, 0.5),
+    ("door_open.ogg", door_open, 0.5),
+    ("door_close.ogg", door_close, 0.6),
+    ("menu_select.ogg", menu_select, 0.3),
+    ("menu_back.ogg", menu_back, 0.3),
+    ("level_up.ogg", level_up, 0.8),
+    ("secret.ogg", secret, 0.6),
+    ("trap.ogg", trap, 0.9),
+]
+
+
+def render(index):
+    """Run generator `index` with its own noise seed, so the output does not
+    depend on which worker process runs it or in what order."""
+    global rng
+    rng = np.random.default_rng((0, index))
+    return SOUNDS[index][1]()
+
+
+def main():
+    print("🔊 Starting full sound synthesis...")
+    os.makedirs(folder, exist_ok=True)
+
+    # The generators are independent; render them across processes. Imported
+    # here so the workers, which re-import this module, don't load it.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor() as pool:
+        buffers = list(pool.map(render, range(len(SOUNDS))))
+
+    sounds = {name: data for (name, _, _), data in zip(SOUNDS, buffers)}
+    for name, _, vol in SOUNDS:
+        save(name, sounds[name], vol)
+
+    # 17. STAIRS (Rapid footsteps)
+    save("stairs.ogg", sounds["footstep_stone.ogg"], 0.5, repeat=4)
+
+    print(f"✅ All {len(SOUNDS) + 1} sounds generated in the '/{folder}' directory.")
+
 
-print(f"✅ All 22 sounds generated in the '/{folder}' directory.")
+if __name__ == "__main__":
+    main()
@@ -96,11 +96,14 @@ echo "Installing pipeline dependencies..."
 pip install trimesh pygltflib numpy Pillow tqdm
 
 # 6. Check Blender
+BLENDER=""
 if command -v blender &>/dev/null; then
+    BLENDER="blender"
     echo "Blender found: $(blender --version 2>&1 | head -1)"
 elif [ -d "/Applications/Blender.app" ]; then
+    BLENDER="/Applications/Blender.app/Contents/MacOS/Blender"
     echo "Blender found at /Applications/Blender.app"
-    echo "Will use: /Applications/Blender.app/Contents/MacOS/Blender"
+    echo "Will use: $BLENDER"
 else
     echo ""
     echo "WARNING: Blender not found."
@@ -108,6 +111,15 @@ else
     echo "The mesh generation step will still work without Blender."
 fi
 
+# Blender ships its own Python; the rig script solves bone heat weights
+# with scipy there and falls back to Blender's automatic weights without it
+if [ -n "$BLENDER" ]; then
+    echo "Installing scipy into Blender's Python..."
+    "$BLENDER" --background --factory-startup --python-expr \
+        "import subprocess, sys; subprocess.check_call([sys.executable, '-m', 'ensurepip']); subprocess.check_call([sys.executable, '-m', 'pip', 'install', '--quiet', 'scipy'])" \
+        >/dev/null 2>&1 || echo "WARNING: could not install scipy for Blender; rigging will use automatic weights."
+fi
+
 echo ""
 echo "=== Setup complete ==="
 echo "Usage:"